@@ -1,7 +1,9 @@
+import uuid
 import streamlit as st
-from PyPDF2 import PdfReader
-from pipeline import run_agent_with_law_text, read_pdf
-from config import MAX_CHARS
+from jobs import job_manager, JobQueueFullError
+from config import SUMMARY_SINGLE_PASS_TOKENS
+from tokenizer import count_tokens
+from metrics import start_metrics_server
 
 # Configuration de la page
 st.set_page_config(
@@ -10,6 +12,13 @@ st.set_page_config(
     layout="wide"
 )
 
+# Endpoint local /metrics (démarré une seule fois par processus, si METRICS_PORT est défini)
+start_metrics_server()
+
+# Session de conversation : les questions de suivi réutilisent l'historique et les résultats d'outils
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
 # Titre de l'application
 st.title("🏛️ Assistant Juridique")
 st.markdown("### Analysez vos documents législatifs avec l'IA")
@@ -26,6 +35,9 @@ with st.sidebar:
     if uploaded_file:
         st.success(f"✓ Fichier chargé : {uploaded_file.name}")
         st.info(f"Taille : {uploaded_file.size / 1024:.2f} KB")
+    
+    if st.button("🔄 Nouvelle conversation", use_container_width=True):
+        st.session_state["session_id"] = uuid.uuid4().hex
 
 # Interface principale
 if uploaded_file is None:
@@ -44,16 +56,24 @@ if uploaded_file is None:
         - L'agent décide automatiquement quels outils utiliser
         - Il peut résumer la loi, analyser la presse, ou les deux
         - Exemples : "Résume cette loi", "Que dit la presse ?", "Fais les deux"
+        - Les questions de suivi réutilisent les réponses précédentes de la conversation
     
     3. **Consultez la réponse** générée par l'agent
     """)
 
 else:
-    # Extraction du texte depuis le fichier uploadé (une seule fois)
+    # Extraction du texte depuis le fichier uploadé (une seule fois par document, mise en cache
+    # par SHA-256) : seule une vraie analyse passe par la file des jobs ; un document déjà extrait
+    # est relu directement depuis le cache disque, à chaque interaction
     with st.spinner("📄 Lecture du document..."):
-        law_text = read_pdf(uploaded_file)
+        try:
+            extraction = job_manager.read_document(uploaded_file.getvalue())
+            law_text = extraction.text
+        except Exception as e:
+            extraction = None
+            law_text = f"Erreur lors de la lecture du PDF : {str(e)}"
     
-    if law_text.startswith("Erreur"):
+    if extraction is None:
         st.error(law_text)
     else:
         # Afficher des informations sur le document
@@ -63,24 +83,21 @@ else:
         with col2:
             st.metric("Mots", f"{len(law_text.split()):,}")
         with col3:
-            st.metric("Pages", len(PdfReader(uploaded_file).pages))
+            st.metric("Pages", extraction.page_count)
         
-        # Limiter le texte pour éviter le dépassement du contexte et les timeouts
-        law_text_truncated = law_text[:MAX_CHARS]
-        
-        if len(law_text) > MAX_CHARS:
-            st.warning(f"⚠️ Le document est long ({len(law_text):,} caractères). Seuls les premiers {MAX_CHARS:,} caractères seront analysés.")
+        # Les longs documents sont résumés intégralement en map-reduce
+        if count_tokens(law_text) > SUMMARY_SINGLE_PASS_TOKENS:
+            st.info(f"ℹ️ Le document est long ({len(law_text):,} caractères). Il sera résumé par parties, en parallèle, puis synthétisé.")
         
         st.divider()
         
         # Mode Agent
         st.subheader("🤖 Assistant Agent IA")
-        st.info("💡 L'agent analyse votre demande et choisit automatiquement l'outil le plus approprié (résumé OU analyse de presse).")
-        st.warning("L'agent ne peut exécuter qu'UN seul outil à la fois.")
+        st.info("💡 L'agent analyse votre demande et choisit automatiquement les outils appropriés (résumé, analyse de presse, ou les deux en parallèle).")
         
         user_query = st.text_input(
             "💬 Que voulez-vous savoir sur cette loi ?",
-            placeholder="Ex: Résume cette loi OU Analyse la presse",
+            placeholder="Ex: Résume cette loi, Analyse la presse, Fais les deux",
             key="agent_query"
         )
         
@@ -95,31 +112,58 @@ else:
                 st.subheader("⚠️ Confirmation")
                 st.write(f"**Votre demande :** {user_query}")
                 st.write(f"**Document :** {uploaded_file.name}")
-                st.write(f"**Taille du texte :** {len(law_text_truncated):,} caractères")
+                st.write(f"**Taille du texte :** {len(law_text):,} caractères")
                 
-                with st.spinner("🤖 L'agent analyse votre demande et sélectionne les outils..."):
-                    try:
-                        # Exécuter l'agent avec le texte déjà extrait
-                        agent_response = run_agent_with_law_text(
-                            law_text_truncated, 
-                            user_query,
-                            max_chars=MAX_CHARS
-                        )
-                        
-                        st.success("✓ L'agent a terminé son analyse")
-                        st.markdown("---")
-                        st.markdown("### 📋 Réponse de l'agent")
+                st.markdown("---")
+                st.markdown("### 📋 Réponse de l'agent")
+                status = st.status("🤖 L'agent analyse votre demande et sélectionne les outils...", expanded=True)
+                try:
+                    # Soumettre la demande au serveur de jobs et suivre ses événements : les réponses
+                    # des outils s'affichent au fil de l'eau (le job est annulé si la page est relancée)
+                    agent_response = None
+                    tool_outputs = {}
+                    tool_buffers = {}
+                    job_id = job_manager.submit_analysis(law_text, user_query, session_id=st.session_state["session_id"])
+                    for event in job_manager.stream(job_id):
+                        if event["type"] == "routing":
+                            if event["tools"]:
+                                status.write(f"🔧 Outils sélectionnés : {', '.join(event['tools'])}")
+                            else:
+                                status.write("ℹ️ Réponse à partir de la conversation (aucun outil sélectionné)")
+                        elif event["type"] == "tool_start":
+                            status.write(f"⏳ {event['tool']} en cours...")
+                            st.markdown(f"## {event['tool']}")
+                            tool_outputs[event["tool"]] = st.empty()
+                            tool_buffers[event["tool"]] = ""
+                        elif event["type"] == "token" and event["tool"] in tool_outputs:
+                            tool_buffers[event["tool"]] += event["content"]
+                            tool_outputs[event["tool"]].markdown(tool_buffers[event["tool"]] + "▌")
+                        elif event["type"] == "tool_end" and event["tool"] in tool_outputs:
+                            if event.get("reused"):
+                                status.write(f"♻️ {event['tool']} : résultat déjà calculé dans cette conversation")
+                            else:
+                                status.write(f"{'✓' if event['status'] == 'success' else '❌'} {event['tool']} terminé")
+                            tool_outputs[event["tool"]].markdown(event["content"])
+                        elif event["type"] == "done":
+                            agent_response = event["response"]
+                    
+                    status.update(label="✓ L'agent a terminé son analyse", state="complete", expanded=False)
+                    if not tool_outputs:
                         st.markdown(agent_response)
-                        
-                        # Bouton de téléchargement
-                        st.download_button(
-                            label="⬇️ Télécharger la réponse",
-                            data=agent_response,
-                            file_name=f"agent_response_{uploaded_file.name.replace('.pdf', '.txt')}",
-                            mime="text/plain"
-                        )
-                    except Exception as e:
-                        st.error(f"❌ Erreur lors de l'exécution de l'agent : {str(e)}")
+                    
+                    # Bouton de téléchargement
+                    st.download_button(
+                        label="⬇️ Télécharger la réponse",
+                        data=agent_response,
+                        file_name=f"agent_response_{uploaded_file.name.replace('.pdf', '.txt')}",
+                        mime="text/plain"
+                    )
+                except JobQueueFullError as e:
+                    status.update(label="⏳ Serveur occupé", state="error")
+                    st.warning(f"⚠️ {e}")
+                except Exception as e:
+                    status.update(label="❌ Échec de l'analyse", state="error")
+                    st.error(f"❌ Erreur lors de l'exécution de l'agent : {str(e)}")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,233 @@
+"""
+Traitement par lots (hors Streamlit) d'un dossier de textes de loi.
+
+Chaque PDF est extrait (cache disque), puis résumé et/ou analysé dans la presse.
+Les documents sont traités en parallèle (parallélisme borné) et chaque résultat est
+ajouté au fichier JSONL dès qu'il est prêt. Ce fichier sert aussi de point de reprise :
+un lot interrompu puis relancé ne retraite pas les documents déjà réussis (identifiés
+par le SHA-256 de leur contenu).
+
+Usage :
+    python batch_runner.py data/ [--output results.jsonl] [--concurrency 4] [--tasks summary press]
+    python batch_runner.py "data/l17b21*.pdf" --request "Résume cette loi et analyse la presse"
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from datetime import datetime, timezone
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from pdf_cache import hash_pdf_bytes
+from config import BATCH_CONCURRENCY, BATCH_OUTPUT_PATH, TITLE_CONTEXT_TOKENS
+
+BATCH_TASKS = ("summary", "press")
+
+
+def collect_pdf_paths(sources: list) -> list:
+    """
+    Liste les PDF désignés par des dossiers, des motifs glob ou des chemins de fichiers.
+
+    Args:
+        sources (list): Dossiers, motifs glob ou fichiers.
+
+    Returns:
+        list: Chemins des PDF, triés et sans doublons.
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(glob.glob(os.path.join(source, "*.pdf")))
+        else:
+            paths.update(path for path in glob.glob(source) if path.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+def load_checkpoint(output_path: str, tasks: tuple, request: str = None) -> set:
+    """
+    Relit le fichier JSONL d'un lot précédent pour reprendre là où il s'est arrêté.
+
+    Args:
+        output_path (str): Fichier JSONL des résultats.
+        tasks (tuple): Tâches demandées pour ce lot.
+        request (str): Demande envoyée à l'agent (None : tâches exécutées directement).
+
+    Returns:
+        set: SHA-256 des documents déjà traités avec succès pour les mêmes tâches.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Dernière ligne tronquée par une interruption : le document sera retraité
+                continue
+            if record.get("status") != "success" or record.get("request") != request:
+                continue
+            if request is not None or set(tasks) <= set(record.get("tasks", [])):
+                done.add(record["sha256"])
+    return done
+
+
+def process_document(path: str, tasks: tuple = BATCH_TASKS, request: str = None) -> dict:
+    """
+    Traite un PDF : extraction, puis résumé et/ou analyse presse.
+
+    Args:
+        path (str): Chemin du PDF.
+        tasks (tuple): Tâches à exécuter ("summary", "press").
+        request (str): Si précisée, la demande est confiée à l'agent (routeur LangGraph)
+            au lieu d'exécuter directement les tâches.
+
+    Returns:
+        dict: Résultats du document (clés "summary", "press" ou "response").
+
+    Raises:
+        RuntimeError: Si une tâche renvoie un message d'erreur (recherche ou appel LLM en échec).
+    """
+    # Imports différés : le module reste léger pour lister les fichiers ou reprendre un lot
+    from pipeline import extract_pdf, run_agent_with_law_text, is_error_result
+    from summarizer_agent import summarize_law_text
+    from tone_analysis_agent import analyze_tone_of_voice, create_law_title
+    from tracing import trace_root
+    from compaction import normalize_text, compact_document
+    from boilerplate import remove_boilerplate
+
+    extraction = extract_pdf(path)
+    law_text = extraction.text
+    result = {"pages": extraction.page_count, "chars": len(law_text)}
+
+    if request is not None:
+        result["response"] = run_agent_with_law_text(law_text, request)
+        return result
+    # Une seule décision de traçage (mode sampled) pour toutes les tâches du document
+    with trace_root():
+        if "summary" in tasks:
+            # Formules types communes aux documents retirées ou résumées (tokens économisés par document)
+            cleaned = remove_boilerplate(normalize_text(law_text))
+            result["summary"] = summarize_law_text(cleaned.text)
+            result["boilerplate"] = cleaned.stats()
+        if "press" in tasks:
+            result["press"] = analyze_tone_of_voice(create_law_title(compact_document(law_text, TITLE_CONTEXT_TOKENS)))
+    # Échecs signalés par un message d'erreur : le document doit être retraité à la reprise
+    for task in ("summary", "press"):
+        if is_error_result(result.get(task)):
+            raise RuntimeError(result[task])
+    return result
+
+
+def run_batch(
+    sources: list,
+    output_path: str = BATCH_OUTPUT_PATH,
+    concurrency: int = BATCH_CONCURRENCY,
+    tasks: tuple = BATCH_TASKS,
+    request: str = None,
+) -> dict:
+    """
+    Traite un lot de PDF en parallèle et écrit les résultats au fil de l'eau en JSONL.
+
+    Args:
+        sources (list): Dossiers, motifs glob ou fichiers PDF.
+        output_path (str): Fichier JSONL des résultats (complété, jamais écrasé).
+        concurrency (int): Nombre maximum de documents traités simultanément.
+        tasks (tuple): Tâches à exécuter ("summary", "press").
+        request (str): Demande confiée à l'agent à la place des tâches directes.
+
+    Returns:
+        dict: Statistiques du lot (documents traités, ignorés, en erreur, débit en docs/min,
+            tokens de formules types économisés).
+    """
+    tasks = tuple(tasks)
+    unknown = set(tasks) - set(BATCH_TASKS)
+    if unknown:
+        raise ValueError(f"Tâches inconnues : {sorted(unknown)} (disponibles : {list(BATCH_TASKS)})")
+
+    done = load_checkpoint(output_path, tasks, request)
+    pending = {}
+    skipped = 0
+    for path in collect_pdf_paths(sources):
+        with open(path, "rb") as f:
+            sha256 = hash_pdf_bytes(f.read())
+        # Document déjà traité (lot précédent) ou contenu identique déjà planifié
+        if sha256 in done or sha256 in pending.values():
+            skipped += 1
+            continue
+        pending[path] = sha256
+
+    print(f"📚 {len(pending)} document(s) à traiter, {skipped} ignoré(s) (déjà traités), {concurrency} en parallèle")
+
+    stats = {"processed": 0, "errors": 0, "skipped": skipped, "boilerplate_tokens_saved": 0}
+    write_lock = threading.Lock()
+    started_at = time.monotonic()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            # Ligne tronquée par une interruption : la terminer pour ne pas corrompre la suivante
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _process(path: str) -> dict:
+        doc_started_at = time.monotonic()
+        record = {"path": path, "sha256": pending[path], "tasks": list(tasks), "request": request}
+        try:
+            record.update(process_document(path, tasks, request))
+            record["status"] = "success"
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["elapsed_s"] = round(time.monotonic() - doc_started_at, 3)
+        record["finished_at"] = datetime.now(timezone.utc).isoformat()
+        return record
+
+    with open(output_path, "a", encoding="utf-8") as output, ContextThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = [executor.submit(_process, path) for path in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                # Une ligne par document, écrite dès sa fin : c'est le point de reprise
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                os.fsync(output.fileno())
+            stats["processed" if record["status"] == "success" else "errors"] += 1
+            stats["boilerplate_tokens_saved"] += record.get("boilerplate", {}).get("tokens_saved", 0)
+            finished = stats["processed"] + stats["errors"]
+            elapsed = time.monotonic() - started_at
+            icon = "✓" if record["status"] == "success" else "❌"
+            print(f"{icon} [{finished}/{len(pending)}] {record['path']} ({record['elapsed_s']:.1f} s, {finished / elapsed * 60:.1f} docs/min)")
+
+    elapsed = time.monotonic() - started_at
+    finished = stats["processed"] + stats["errors"]
+    stats["elapsed_s"] = round(elapsed, 3)
+    stats["docs_per_min"] = round(finished / elapsed * 60, 2) if finished else 0.0
+    print(
+        f"\n🏁 {stats['processed']} réussi(s), {stats['errors']} en erreur, {skipped} ignoré(s) "
+        f"en {elapsed:.1f} s ({stats['docs_per_min']:.1f} docs/min) → {output_path}"
+    )
+    if stats["boilerplate_tokens_saved"]:
+        print(f"♻️  {stats['boilerplate_tokens_saved']} tokens de formules types économisés avant résumé")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="Dossiers, motifs glob ou fichiers PDF")
+    parser.add_argument("--output", default=BATCH_OUTPUT_PATH, help="Fichier JSONL des résultats (point de reprise)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Documents traités simultanément")
+    parser.add_argument("--tasks", nargs="+", default=list(BATCH_TASKS), choices=BATCH_TASKS)
+    parser.add_argument("--request", help="Confier cette demande à l'agent au lieu d'exécuter les tâches directement")
+    args = parser.parse_args()
+
+    stats = run_batch(args.sources, args.output, args.concurrency, tuple(args.tasks), args.request)
+    if stats["errors"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark du repérage des formules types (`boilerplate.remove_boilerplate`) sur les PDF de `data/`.
+
+Les documents sont traités deux fois avec une base d'empreintes neuve (temporaire) :
+    - premier passage : dans l'ordre du lot, chaque document ne profite que des précédents ;
+    - second passage : tous les documents sont connus (lots suivants, base persistante).
+Pour chaque document : formules types retirées ou résumées, tokens avant/après et économisés.
+Les mini-résumés sont générés par `fakes.FakeChatModel` (nombre d'appels LLM rapporté).
+
+Usage :
+    python benchmarks/bench_boilerplate.py [--min-documents 2]
+"""
+import argparse
+import atexit
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Base d'empreintes et environnement isolés, fixés avant l'import de config
+_tmp_dir = tempfile.mkdtemp(prefix="bench_boilerplate_")
+atexit.register(shutil.rmtree, _tmp_dir, ignore_errors=True)
+for _name in ("LANGFUSE_SECRET_KEY", "LANGFUSE_PUBLIC_KEY", "LANGFUSE_BASE_URL"):
+    os.environ[_name] = ""
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+os.environ["LLM_CACHE_PATH"] = ""
+
+from fakes import FakeChatModel  # noqa: E402
+from llm_client import set_llm_override  # noqa: E402
+from pdf_extraction import extract_pages  # noqa: E402
+from compaction import normalize_text  # noqa: E402
+from boilerplate import BoilerplateStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT_DIR, "data"))
+    parser.add_argument("--min-documents", type=int, default=2, help="Textes de loi distincts à partir desquels un paragraphe est une formule type")
+    args = parser.parse_args()
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.pdf"))):
+        with open(path, "rb") as f:
+            documents.append((os.path.basename(path), normalize_text("".join(extract_pages(f.read(), workers=1)))))
+    if not documents:
+        sys.exit(f"Aucun PDF trouvé dans {args.data_dir}")
+
+    fake_llm = FakeChatModel(completion_tokens=12)
+    set_llm_override(fake_llm)
+    store = BoilerplateStore(path=os.path.join(_tmp_dir, "boilerplate.sqlite"), min_documents=args.min_documents)
+
+    print(f"{len(documents)} documents, formule type dès {args.min_documents} documents\n")
+    print(f"{'passage':<8} {'document':<32} {'formules':>8} {'retirées':>9} {'résumées':>9} {'tokens':>7} {'après':>7} {'économisés':>11} {'durée':>9}")
+    for label in ("1er", "2e"):
+        saved = before = 0
+        for name, text in documents:
+            started_at = time.perf_counter()
+            result = store.remove(text)
+            elapsed = time.perf_counter() - started_at
+            saved += result.tokens_saved
+            before += result.tokens_before
+            print(
+                f"{label:<8} {name:<32} {result.paragraphs:>8} {result.dropped:>9} {result.summarized:>9} "
+                f"{result.tokens_before:>7} {result.tokens_after:>7} {result.tokens_saved:>6} ({result.tokens_saved / result.tokens_before:>4.1%}) {elapsed * 1e3:>6.1f} ms"
+            )
+        print(f"{label:<8} {'total':<32} {'':>8} {'':>9} {'':>9} {before:>7} {before - saved:>7} {saved:>6} ({saved / before:>4.1%})\n")
+    print(f"Base : {store.stats()}, appels LLM (mini-résumés) : {fake_llm.calls}")
+
+
+if __name__ == "__main__":
+    main()
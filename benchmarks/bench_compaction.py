@@ -0,0 +1,97 @@
+"""
+Benchmark de la compaction des textes de loi sur les PDF de `data/`.
+
+Pour un même budget de tokens, compare l'ancienne troncature aux premiers caractères
+(texte brut PyPDF2) à `compaction.compact_document` : part du budget consacrée au contenu
+du texte (exposé des motifs et articles), articles couverts, et coût de la compaction
+(premier appel, puis appel servi par le cache).
+
+Usage :
+    python benchmarks/bench_compaction.py [--budgets 600 1200 2400]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from pdf_extraction import extract_pages  # noqa: E402
+from compaction import compact_document, normalize_text  # noqa: E402
+from retrieval import segment_document  # noqa: E402
+from tokenizer import count_tokens, split_by_tokens  # noqa: E402
+
+CONTENT_SECTIONS = ("Exposé des motifs", "Article")
+
+
+def content_tokens(text: str) -> int:
+    """Tokens appartenant à l'exposé des motifs ou aux articles."""
+    return sum(
+        count_tokens(passage.text)
+        for passage in segment_document(text)
+        if passage.section.startswith(CONTENT_SECTIONS)
+    )
+
+
+def articles(text: str) -> set:
+    """Intitulés des articles présents dans le texte."""
+    return {passage.section for passage in segment_document(text) if passage.section.startswith("Article")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT_DIR, "data"))
+    parser.add_argument("--budgets", type=int, nargs="+", default=[600, 1200, 2400])
+    args = parser.parse_args()
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.pdf"))):
+        with open(path, "rb") as f:
+            documents.append((os.path.basename(path), "".join(extract_pages(f.read(), workers=1))))
+    if not documents:
+        sys.exit(f"Aucun PDF trouvé dans {args.data_dir}")
+
+    print(f"{len(documents)} documents\n")
+    for name, text in documents:
+        raw_tokens, normalized_tokens = count_tokens(text), count_tokens(normalize_text(text))
+        print(f"{name}  {raw_tokens} tokens bruts → {normalized_tokens} normalisés ({1 - normalized_tokens / raw_tokens:.1%} de bruit retiré), {len(articles(text))} articles")
+
+    print(f"\n{'budget':>7}  {'méthode':<12} {'contenu':>8} {'part':>6} {'articles':>9}  {'1er appel':>10} {'en cache':>9}")
+    for budget in args.budgets:
+        totals = {"troncature": [0, 0, 0, 0.0, 0.0], "compaction": [0, 0, 0, 0.0, 0.0]}
+        for _, text in documents:
+            total_articles = len(articles(text))
+            started_at = time.perf_counter()
+            # Ancienne troncature, ramenée au même budget de tokens
+            truncated = split_by_tokens(text, budget)[0]
+            truncated_s = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            compacted = compact_document(text, budget)
+            cold_s = time.perf_counter() - started_at
+            started_at = time.perf_counter()
+            compact_document(text, budget)
+            cached_s = time.perf_counter() - started_at
+
+            for method, output, first_s, again_s in (
+                ("troncature", truncated, truncated_s, truncated_s),
+                ("compaction", compacted, cold_s, cached_s),
+            ):
+                total = totals[method]
+                total[0] += content_tokens(output)
+                total[1] += count_tokens(output)
+                total[2] += len(articles(output)) / total_articles if total_articles else 1
+                total[3] += first_s
+                total[4] += again_s
+
+        for method, (content, used, coverage, first_s, again_s) in totals.items():
+            print(
+                f"{budget:>7}  {method:<12} {content:>8} {content / used:>6.0%} {coverage / len(documents):>9.0%}  "
+                f"{first_s / len(documents) * 1e3:>8.2f} ms {again_s / len(documents) * 1e3:>6.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
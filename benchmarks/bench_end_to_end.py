@@ -0,0 +1,295 @@
+"""
+Benchmark de bout en bout du pipeline (graphe LangGraph et outils) sur les PDF de `data/`,
+sans appel externe : le LLM et la recherche de presse sont remplacés par les faux backends
+de `fakes.py` (latence et débit de tokens configurables), Langfuse est désactivé.
+
+Mesures :
+    - latence p50/p95/p99 des requêtes et débit (requêtes/s) pour chaque niveau de concurrence
+    - découpage par étape : extraction, routage, outils (et chaque outil), post-traitement
+    - latence de chaque outil appelé directement
+    - pic de mémoire (RSS) du processus et de ses processus d'extraction
+
+Usage :
+    python benchmarks/bench_end_to_end.py [--concurrency 1 4 8] [--repeat 2] [--json results.json]
+    python benchmarks/bench_end_to_end.py --json new.json --compare old.json
+"""
+import argparse
+import atexit
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Environnement isolé, fixé avant l'import de config : pas de Langfuse, pas de cache LLM,
+# cache PDF et empreintes des formules types temporaires (chaînes vides : load_dotenv ne remplace pas
+# les variables existantes)
+for _name in ("LANGFUSE_SECRET_KEY", "LANGFUSE_PUBLIC_KEY", "LANGFUSE_BASE_URL"):
+    os.environ[_name] = ""
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["PDF_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_pdf_cache_")
+os.environ["BOILERPLATE_DB_PATH"] = os.path.join(os.environ["PDF_CACHE_DIR"], "boilerplate.sqlite")
+atexit.register(shutil.rmtree, os.environ["PDF_CACHE_DIR"], ignore_errors=True)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fakes import FakeChatModel, FakeNewsBackend  # noqa: E402
+from llm_client import set_llm_override  # noqa: E402
+from metrics import metrics_callback_handler  # noqa: E402
+from news_search import news_search  # noqa: E402
+from pdf_extraction import extract_pages  # noqa: E402
+from pipeline import (  # noqa: E402
+    graph,
+    extract_pdf,
+    summarize_tool,
+    tone_analysis_tool,
+    _build_initial_state,
+    _format_tool_results,
+)
+
+
+def percentile(values: list, q: float) -> float:
+    """Percentile `q` (0-100) par interpolation linéaire."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_timings(values: list) -> dict:
+    """Statistiques d'une série de durées (secondes)."""
+    return {
+        "count": len(values),
+        "mean_s": sum(values) / len(values) if values else 0.0,
+        "p50_s": percentile(values, 50),
+        "p95_s": percentile(values, 95),
+        "p99_s": percentile(values, 99),
+        "max_s": max(values) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> dict:
+    """Pic de mémoire résidente du processus et de ses enfants (Mo, Linux/macOS uniquement)."""
+    if resource is None:
+        return {}
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit,
+    }
+
+
+def run_request(path: str, user_request: str) -> dict:
+    """
+    Exécute une requête complète (extraction + graphe) et mesure chaque étape.
+
+    Returns:
+        dict: Durées (secondes) par étape, par outil et totale.
+    """
+    started_at = time.perf_counter()
+    law_text = extract_pdf(path).text
+    extracted_at = time.perf_counter()
+
+    _, _, initial_state = _build_initial_state(law_text, user_request)
+    messages = []
+    tool_started = {}
+    tools = {}
+    graph_started_at = time.perf_counter()
+    routed_at = tools_done_at = None
+    for mode, chunk in graph.stream(initial_state, stream_mode=["updates", "custom"]):
+        now = time.perf_counter()
+        if mode == "custom":
+            if chunk["type"] == "tool_start":
+                tool_started[chunk["tool"]] = now
+            elif chunk["type"] == "tool_end":
+                tools[chunk["tool"]] = now - tool_started.get(chunk["tool"], now)
+            continue
+        for node, update in chunk.items():
+            messages.extend((update or {}).get("messages", []))
+            if node == "agent":
+                routed_at = now
+            elif node == "tool":
+                tools_done_at = now
+    graph_done_at = time.perf_counter()
+    _format_tool_results(messages)
+    finished_at = time.perf_counter()
+
+    routed_at = routed_at or graph_done_at
+    return {
+        "total": finished_at - started_at,
+        "stages": {
+            "extraction": extracted_at - started_at,
+            "routing": routed_at - graph_started_at,
+            "tool": (tools_done_at or routed_at) - routed_at,
+            "post_processing": finished_at - graph_done_at,
+        },
+        "tools": tools,
+    }
+
+
+def bench_concurrency(paths: list, user_request: str, concurrency: int, repeat: int) -> dict:
+    """Exécute toutes les requêtes avec `concurrency` requêtes simultanées."""
+    jobs = [path for _ in range(repeat) for path in paths]
+    while len(jobs) < concurrency:
+        jobs.extend(paths)
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda path: run_request(path, user_request), jobs))
+    elapsed = time.perf_counter() - started_at
+
+    stage_names = results[0]["stages"].keys()
+    tool_names = sorted({name for result in results for name in result["tools"]})
+    return {
+        "requests": len(results),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(results) / elapsed,
+        "latency": summarize_timings([result["total"] for result in results]),
+        "stages": {name: summarize_timings([result["stages"][name] for result in results]) for name in stage_names},
+        "tools": {name: summarize_timings([r["tools"][name] for r in results if name in r["tools"]]) for name in tool_names},
+    }
+
+
+def bench_tools(paths: list, repeat: int) -> dict:
+    """Appelle directement chaque outil sur chaque document (séquentiellement)."""
+    timings = {summarize_tool.name: [], tone_analysis_tool.name: []}
+    for _ in range(repeat):
+        for path in paths:
+            law_text = extract_pdf(path).text
+            for tool in (summarize_tool, tone_analysis_tool):
+                started_at = time.perf_counter()
+                tool.invoke({"doc_id": "bench", "law_text": law_text})
+                timings[tool.name].append(time.perf_counter() - started_at)
+    return {name: summarize_timings(values) for name, values in timings.items()}
+
+
+def bench_cold_extraction(paths: list) -> dict:
+    """Extraction sans cache de chaque document, puis remplissage du cache PDF."""
+    timings = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        started_at = time.perf_counter()
+        extract_pages(data)
+        timings.append(time.perf_counter() - started_at)
+        extract_pdf(data)
+    return summarize_timings(timings)
+
+
+def git_commit() -> str:
+    """Commit courant (pour comparer les résultats entre commits), ou None."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    """Affiche l'évolution des latences et débits par rapport à un fichier de résultats précédent."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparaison avec {baseline_path} (commit {baseline.get('commit')}) :")
+    for level, current in results["concurrency"].items():
+        previous = baseline.get("concurrency", {}).get(level)
+        if previous is None:
+            continue
+        for label, key in (("p50", "p50_s"), ("p95", "p95_s")):
+            old, new = previous["latency"][key], current["latency"][key]
+            print(f"  c={level:<3} {label}  {old:8.3f} s → {new:8.3f} s  ({(new - old) / old * 100 if old else 0:+6.1f} %)")
+        old, new = previous["throughput_rps"], current["throughput_rps"]
+        print(f"  c={level:<3} débit {old:6.2f} → {new:6.2f} req/s  ({(new - old) / old * 100 if old else 0:+6.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT_DIR, "data"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--request", default="Fais les deux : résume cette loi et analyse la presse.")
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Latence simulée du premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Débit simulé de génération")
+    parser.add_argument("--completion-tokens", type=int, default=100, help="Tokens générés par réponse simulée")
+    parser.add_argument("--news-latency", type=float, default=0.3, help="Latence simulée d'une recherche de presse (s)")
+    parser.add_argument("--json", help="Fichier de sortie JSON")
+    parser.add_argument("--compare", help="Fichier JSON d'un run précédent à comparer")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, "*.pdf")))
+    if not paths:
+        sys.exit(f"Aucun PDF trouvé dans {args.data_dir}")
+
+    fake_llm = FakeChatModel(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        # Métriques locales des appels LLM (METRICS_FILE), comme pour le client OpenAI
+        callbacks=[metrics_callback_handler],
+    )
+    set_llm_override(fake_llm)
+    fake_news = FakeNewsBackend(latency=args.news_latency)
+    news_search.backend = fake_news
+    # Titres simulés identiques d'un document à l'autre : sans TTL, chaque requête interroge le backend
+    news_search.ttl_seconds = news_search.negative_ttl_seconds = 0
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "documents": [os.path.basename(path) for path in paths],
+    }
+    # Les prints du pipeline (progression, debug) sont masqués pendant les mesures
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["extraction_cold"] = bench_cold_extraction(paths)
+        results["tools"] = bench_tools(paths, args.repeat)
+        results["concurrency"] = {
+            str(level): bench_concurrency(paths, args.request, level, args.repeat) for level in args.concurrency
+        }
+    results["llm_calls"] = fake_llm.calls
+    results["news_calls"] = len(fake_news.calls)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    print(f"{len(paths)} documents, LLM simulé : {args.first_token_latency} s + {args.completion_tokens} tokens à {args.tokens_per_second} tokens/s\n")
+    print(f"extraction à froid          p50 {results['extraction_cold']['p50_s']:7.3f} s  p95 {results['extraction_cold']['p95_s']:7.3f} s")
+    for name, timings in results["tools"].items():
+        print(f"outil {name:<21} p50 {timings['p50_s']:7.3f} s  p95 {timings['p95_s']:7.3f} s")
+    print()
+    for level, level_results in results["concurrency"].items():
+        latency = level_results["latency"]
+        print(
+            f"concurrence {level:>3} : {level_results['throughput_rps']:6.2f} req/s  "
+            f"p50 {latency['p50_s']:6.3f} s  p95 {latency['p95_s']:6.3f} s  p99 {latency['p99_s']:6.3f} s"
+        )
+        for name, timings in {**level_results["stages"], **level_results["tools"]}.items():
+            print(f"    {name:<22} p50 {timings['p50_s']:7.3f} s  p95 {timings['p95_s']:7.3f} s")
+    rss = results["peak_rss_mb"]
+    if rss:
+        print(f"\npic RSS : {rss['self']:.1f} Mo (processus), {rss['children']:.1f} Mo (extraction)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark du démarrage à froid : durée d'import des modules de l'application.
+
+Chaque mesure lance un interpréteur neuf (`python -X importtime -c "import <module>"`)
+pour reproduire un redémarrage de conteneur.
+
+Usage :
+    python benchmarks/bench_import.py [--modules pipeline app] [--repeat 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str) -> tuple:
+    """
+    Importe un module dans un interpréteur neuf.
+
+    Args:
+        module (str): Nom du module à importer.
+
+    Returns:
+        tuple[float, list]: Durée totale (s) et liste (durée cumulée en µs, module) des imports.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible :\n{completed.stderr[-2000:]}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, cumulative, name = line.replace("import time:", "|", 1).split("|")
+        # L'indentation du nom (2 espaces par niveau) donne la profondeur d'import
+        imports.append((int(cumulative), name[1:].rstrip()))
+    return elapsed, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["config", "pipeline"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Nombre de dépendances les plus coûteuses affichées")
+    parser.add_argument("--json", help="Fichier de sortie JSON (comparaison entre commits)")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        timings = []
+        imports = []
+        for _ in range(args.repeat):
+            elapsed, imports = measure_import(module)
+            timings.append(elapsed)
+        # Dépendances directes (premier niveau d'indentation) les plus coûteuses
+        top_level = sorted(
+            ((cumulative, name) for cumulative, name in imports if name.startswith("  ") and not name.startswith("    ")),
+            reverse=True,
+        )[:args.top]
+        results[module] = {
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "max_s": max(timings),
+            "top_imports": [{"module": name.strip(), "cumulative_ms": cumulative / 1000} for cumulative, name in top_level],
+        }
+
+        print(f"import {module:<12} min {min(timings):.3f} s  médiane {statistics.median(timings):.3f} s  max {max(timings):.3f} s")
+        for entry in results[module]["top_imports"]:
+            print(f"    {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
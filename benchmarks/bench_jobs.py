@@ -0,0 +1,119 @@
+"""
+Benchmark du serveur de jobs (`jobs.JobManager`) sous une rafale de demandes, sans appel
+externe : le LLM et la recherche de presse sont remplacés par les faux backends de `fakes.py`.
+
+Pour chaque nombre de workers, `--requests` analyses sont soumises d'un coup (sessions
+distinctes) sur un document de `data/`. Mesures : débit (analyses/s), attente dans la file et
+latence de bout en bout (p50/p95), nombre de demandes refusées quand la file est pleine.
+
+Usage :
+    python benchmarks/bench_jobs.py [--workers 1 4 8] [--queue-size 16] [--requests 24]
+"""
+import argparse
+import atexit
+import contextlib
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Environnement isolé, fixé avant l'import de config (voir bench_end_to_end.py)
+for _name in ("LANGFUSE_SECRET_KEY", "LANGFUSE_PUBLIC_KEY", "LANGFUSE_BASE_URL"):
+    os.environ[_name] = ""
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["SESSION_DB_PATH"] = ""
+os.environ["PDF_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_pdf_cache_")
+os.environ["BOILERPLATE_DB_PATH"] = os.path.join(os.environ["PDF_CACHE_DIR"], "boilerplate.sqlite")
+atexit.register(shutil.rmtree, os.environ["PDF_CACHE_DIR"], ignore_errors=True)
+
+from fakes import FakeChatModel, FakeNewsBackend  # noqa: E402
+from llm_client import set_llm_override  # noqa: E402
+from news_search import news_search  # noqa: E402
+from jobs import JobManager, JobQueueFullError  # noqa: E402
+
+
+def percentile(values: list, q: float) -> float:
+    """Percentile `q` (0-100) par interpolation linéaire."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def bench_workers(law_text: str, user_request: str, workers: int, queue_size: int, requests: int) -> dict:
+    """Soumet `requests` analyses d'un coup à un gestionnaire de `workers` workers."""
+    manager = JobManager(workers=workers, queue_size=queue_size, retention=requests)
+    job_ids, rejected = [], 0
+    started_at = time.perf_counter()
+    for i in range(requests):
+        try:
+            job_ids.append(manager.submit_analysis(law_text, user_request, session_id=f"bench-{workers}-{i}"))
+        except JobQueueFullError:
+            rejected += 1
+    for job_id in job_ids:
+        manager.wait(job_id)
+    elapsed = time.perf_counter() - started_at
+
+    snapshots = [manager.get(job_id) for job_id in job_ids]
+    waits = [s["started_at"] - s["created_at"] for s in snapshots]
+    latencies = [s["finished_at"] - s["created_at"] for s in snapshots]
+    return {
+        "accepted": len(job_ids),
+        "rejected": rejected,
+        "throughput": len(job_ids) / elapsed,
+        "wait_p50": percentile(waits, 50),
+        "wait_p95": percentile(waits, 95),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT_DIR, "data"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--request", default="Fais les deux : résume cette loi et analyse la presse.")
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Latence simulée du premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Débit simulé de génération")
+    parser.add_argument("--news-latency", type=float, default=0.3, help="Latence simulée d'une recherche de presse (s)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, "*.pdf")))
+    if not paths:
+        sys.exit(f"Aucun PDF trouvé dans {args.data_dir}")
+
+    set_llm_override(FakeChatModel(first_token_latency=args.first_token_latency, tokens_per_second=args.tokens_per_second))
+    news_search.backend = FakeNewsBackend(latency=args.news_latency)
+    news_search.ttl_seconds = news_search.negative_ttl_seconds = 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Lecture du document par un job, comme dans l'application
+        reader = JobManager(workers=1, queue_size=1)
+        with open(paths[0], "rb") as f:
+            law_text = reader.wait(reader.submit_document(f.read())).text
+
+    print(f"{args.requests} analyses soumises d'un coup, file de {args.queue_size} jobs ({os.path.basename(paths[0])})\n")
+    print(f"{'workers':>7} {'acceptés':>9} {'refusés':>8} {'débit':>11} {'attente p50':>12} {'p95':>8} {'latence p50':>12} {'p95':>8}")
+    for workers in args.workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = bench_workers(law_text, args.request, workers, args.queue_size, args.requests)
+        print(
+            f"{workers:>7} {result['accepted']:>9} {result['rejected']:>8} {result['throughput']:>7.2f} /s "
+            f"{result['wait_p50']:>10.2f} s {result['wait_p95']:>6.2f} s {result['latency_p50']:>10.2f} s {result['latency_p95']:>6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
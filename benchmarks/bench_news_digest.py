@@ -0,0 +1,125 @@
+"""
+Benchmark du condensé de presse (`news_digest.build_news_digest`) sur des résultats de
+recherche synthétiques où des dépêches sont reprises, sous des titres presque identiques,
+par de nombreux médias.
+
+Compare l'ancien prompt (les 10 premiers articles de la recherche sur le titre, avec titre,
+source et lien) au condensé de la même recherche (tous ses articles, quasi-doublons
+regroupés, sources diversifiées) : tokens envoyés au LLM, médias et dépêches distincts
+couverts, reprises d'une même dépêche envoyées en double, temps de construction.
+
+Usage :
+    python benchmarks/bench_news_digest.py [--stories 12] [--syndication 6] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from news_digest import build_news_digest, flatten_articles  # noqa: E402
+from tokenizer import count_tokens  # noqa: E402
+
+OUTLETS = [
+    "Le Monde", "Le Figaro", "Libération", "Ouest-France", "20 Minutes", "BFMTV", "France Info",
+    "Les Échos", "L'Humanité", "La Croix", "Le Parisien", "Public Sénat", "Mediapart", "L'Opinion",
+    "Sud Ouest", "La Dépêche", "Le Point", "L'Express", "Marianne", "Valeurs actuelles",
+]
+SUBJECTS = [
+    "la proposition de loi sur la sécurité sociale", "le texte sur les retraites agricoles",
+    "la réforme du logement social", "la loi sur la fin de vie", "le projet sur l'assurance chômage",
+    "la proposition sur les déserts médicaux", "le texte sur l'audiovisuel public",
+    "la loi de programmation militaire", "la réforme de la police municipale",
+    "le texte sur la protection de l'enfance", "la loi sur l'immigration", "le budget de la sécurité sociale",
+]
+VERBS = ["adopte", "rejette", "examine", "amende", "vote", "repousse"]
+ACTORS = ["L'Assemblée nationale", "Le Sénat", "Les députés", "La commission des affaires sociales"]
+# Variantes de reprise d'une dépêche (préfixes, suffixes, mots remplacés)
+VARIANTS = [
+    lambda title, outlet: title,
+    lambda title, outlet: f"{title} - {outlet}",
+    lambda title, outlet: f"VIDÉO. {title}",
+    lambda title, outlet: title.replace("nationale", "").replace("  ", " "),
+    lambda title, outlet: f"{title} (AFP)",
+    lambda title, outlet: f"Direct - {title}",
+    lambda title, outlet: title.rstrip(".") + " en première lecture",
+]
+
+
+def synthetic_stories(count: int, syndication: int, rng: random.Random) -> list:
+    """Dépêches synthétiques, chacune reprise par 1 à `syndication` médias sous des titres voisins."""
+    stories = []
+    for story in range(count):
+        title = f"{rng.choice(ACTORS)} {rng.choice(VERBS)} {SUBJECTS[story % len(SUBJECTS)]}"
+        stories.append([
+            {
+                "title": rng.choice(VARIANTS)(title, outlet),
+                "source": {"name": outlet},
+                "link": f"https://example.org/{story}/{outlet.lower().replace(' ', '-')}",
+                "story": story,
+            }
+            for outlet in rng.sample(OUTLETS, rng.randint(1, syndication))
+        ])
+    return stories
+
+
+def search_results(stories: list) -> dict:
+    """Réponse de recherche : Google News classe les reprises d'une même dépêche côte à côte."""
+    return {"news_results": [article for story in stories for article in story]}
+
+
+def old_prompt(results: dict) -> tuple:
+    """Ancien format : les 10 premiers articles de la première recherche, avec leur lien."""
+    articles = results["news_results"][:10]
+    text = "\n\n".join(f"Titre : {a['title']}\nSource : {a['source']['name']}\nLien : {a['link']}\n" for a in articles)
+    return text, articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=12, help="Dépêches par recherche")
+    parser.add_argument("--syndication", type=int, default=6, help="Reprises maximales d'une dépêche")
+    parser.add_argument("--runs", type=int, default=20, help="Jeux de résultats synthétiques")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    totals = {"ancien": [0, 0, 0, 0, 0.0], "condensé": [0, 0, 0, 0, 0.0]}
+    for _ in range(args.runs):
+        stories = synthetic_stories(args.stories, args.syndication, rng)
+        results = search_results(stories)
+
+        text, articles = old_prompt(results)
+        covered = [a["story"] for a in articles]
+        old = totals["ancien"]
+        old[0] += count_tokens(text)
+        old[1] += len({a["source"]["name"] for a in articles})
+        old[2] += len(set(covered))
+        old[3] += len(covered) - len(set(covered))
+
+        started_at = time.perf_counter()
+        digest = build_news_digest(results)
+        elapsed = time.perf_counter() - started_at
+        story_of = {a["link"]: a["story"] for story in stories for a in story}
+        covered = [story_of[item.link] for item in digest.items]
+        new = totals["condensé"]
+        new[0] += count_tokens(digest.render())
+        new[1] += len({item.source for item in digest.items})
+        new[2] += len(set(covered))
+        new[3] += len(covered) - len(set(covered))
+        new[4] += elapsed
+
+    print(f"{args.runs} jeux de résultats, {args.stories} dépêches par recherche reprises jusqu'à {args.syndication} fois ({len(flatten_articles(results))} articles dans le dernier)\n")
+    print(f"{'prompt':<10} {'tokens':>7} {'médias':>7} {'dépêches':>9} {'doublons':>9} {'construction':>13}")
+    for name, (tokens, outlets, stories, duplicates, elapsed) in totals.items():
+        print(
+            f"{name:<10} {tokens / args.runs:>7.0f} {outlets / args.runs:>7.1f} {stories / args.runs:>9.1f} "
+            f"{duplicates / args.runs:>9.1f} {elapsed / args.runs * 1e3:>10.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
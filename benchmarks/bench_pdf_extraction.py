@@ -0,0 +1,69 @@
+"""
+Benchmark de l'extraction PDF (série vs pool de processus) sur les PDF de `data/`.
+
+Usage :
+    python benchmarks/bench_pdf_extraction.py [--workers 4] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from pdf_extraction import count_pages, extract_pages, iter_pages, read_prefix  # noqa: E402
+
+
+def prefix_page_count(data: bytes, max_chars: int) -> int:
+    """Nombre de pages analysées par `read_prefix` avant d'atteindre `max_chars` caractères."""
+    length = 0
+    for index, text in iter_pages(data):
+        length += len(text)
+        if length >= max_chars:
+            return index + 1
+    return count_pages(data)
+
+
+def bench(label: str, documents: list, fn, repeat: int, page_counts: list = None) -> None:
+    """
+    Exécute `fn` sur chaque document et affiche le débit en pages/s
+    (pages effectivement analysées : `page_counts`, par défaut toutes les pages).
+    """
+    total_pages = sum(page_counts or [pages for _, pages in documents]) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data, _ in documents:
+            fn(data)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {total_pages:>6} pages  {elapsed:8.3f} s  {total_pages / elapsed:8.1f} pages/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT_DIR, "data"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-chars", type=int, default=5000)
+    args = parser.parse_args()
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.pdf"))):
+        with open(path, "rb") as f:
+            data = f.read()
+        documents.append((data, count_pages(data)))
+    if not documents:
+        sys.exit(f"Aucun PDF trouvé dans {args.data_dir}")
+
+    print(f"{len(documents)} documents, {sum(p for _, p in documents)} pages, {args.workers} workers\n")
+    bench("série", documents, lambda data: extract_pages(data, workers=1), args.repeat)
+    bench(f"parallèle ({args.workers} workers)", documents,
+          lambda data: extract_pages(data, workers=args.workers, min_pages_per_worker=1), args.repeat)
+    bench(f"préfixe ({args.max_chars} car.)", documents,
+          lambda data: read_prefix(data, args.max_chars), args.repeat,
+          page_counts=[prefix_page_count(data, args.max_chars) for data, _ in documents])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Micro-benchmark du coût du traçage par requête, pour chaque mode (`TRACING_MODE`).
+
+Chaque mode est mesuré dans un interpréteur neuf (le mode est lu à l'import). Une requête
+synthétique reproduit la forme d'une requête réelle : une fonction racine et deux fonctions
+décorées par `tracing.observe`, chacune exécutant une petite chaîne LangChain avec
+`callbacks_config()` sur un texte de loi de 5000 caractères. Les spans sont exportés vers
+un faux serveur Langfuse local : seul le coût côté requête est mesuré.
+
+Usage :
+    python benchmarks/bench_tracing.py [--requests 2000] [--sample-rate 0.1] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("off", "sampled", "full")
+
+
+def run_child(requests: int) -> dict:
+    """Mesure la requête synthétique dans ce processus (mode fixé par l'environnement)."""
+    sys.path.insert(0, ROOT_DIR)
+    from langchain_core.runnables import RunnableLambda
+    from tracing import observe, callbacks_config, tracing_mode, get_langfuse_client
+
+    chain = RunnableLambda(lambda text: text[:100])
+    law_text = "Article premier. " * 300
+
+    @observe(name="child_a")
+    def child_a(text):
+        return chain.invoke(text, config=callbacks_config())
+
+    @observe(name="child_b")
+    def child_b(text):
+        return chain.invoke(text, config=callbacks_config(tags=["nostream"]))
+
+    @observe(name="request")
+    def request(text):
+        return child_a(text) + child_b(text)
+
+    # Échauffement (imports différés, création du client)
+    for _ in range(20):
+        request(law_text)
+
+    timings = []
+    for _ in range(requests):
+        started_at = time.perf_counter()
+        request(law_text)
+        timings.append(time.perf_counter() - started_at)
+
+    flush_started_at = time.perf_counter()
+    if tracing_mode != "off":
+        get_langfuse_client().flush()
+    ordered = sorted(timings)
+    return {
+        "mode": tracing_mode,
+        "requests": requests,
+        "mean_us": statistics.mean(timings) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p99_us": ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1e6,
+        "flush_s": time.perf_counter() - flush_started_at,
+    }
+
+
+def start_sink():
+    """Démarre un faux endpoint OTLP Langfuse qui accepte tous les exports."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class SinkHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--json", help="Fichier de sortie JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.requests)))
+        return
+
+    sink = start_sink()
+    results = {}
+    for mode in args.modes:
+        env = {
+            **os.environ,
+            "TRACING_MODE": mode,
+            "TRACING_SAMPLE_RATE": str(args.sample_rate),
+            "LANGFUSE_PUBLIC_KEY": "pk-bench",
+            "LANGFUSE_SECRET_KEY": "sk-bench",
+            "LANGFUSE_BASE_URL": f"http://127.0.0.1:{sink.server_address[1]}",
+            "LLM_CACHE_PATH": "",
+        }
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--requests", str(args.requests)],
+            cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Mode {mode} en échec :\n{completed.stderr[-2000:]}")
+        results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    baseline = results.get("off", {}).get("mean_us")
+    print(f"{args.requests} requêtes par mode (3 spans et 2 appels LangChain par requête), sample rate {args.sample_rate}\n")
+    for mode, result in results.items():
+        overhead = f"  +{result['mean_us'] - baseline:8.1f} µs/requête vs off" if baseline is not None and mode != "off" else ""
+        print(
+            f"{mode:<8} moyenne {result['mean_us']:9.1f} µs  p50 {result['p50_us']:9.1f} µs  "
+            f"p99 {result['p99_us']:9.1f} µs  flush {result['flush_s']:.2f} s{overhead}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
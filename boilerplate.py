@@ -0,0 +1,294 @@
+"""
+Repérage des paragraphes types communs à plusieurs textes de loi.
+
+Chaque paragraphe d'un document résumé est enregistré par son empreinte (SHA-256 du texte en
+minuscules, espaces normalisés) avec l'identifiant du texte de loi (`bill_id` : son intitulé,
+commun à ses versions successives). Un paragraphe présent dans au moins
+`BOILERPLATE_MIN_DOCUMENTS` textes distincts est une formule type :
+
+- hors des articles (préambule, exposé des motifs), il est retiré, ou remplacé par son
+  mini-résumé s'il est long ;
+- dans les articles, seules les formules longues sont remplacées par leur mini-résumé (les
+  formules courtes font partie du dispositif et coûtent peu).
+
+Les mini-résumés sont générés une seule fois par paragraphe et conservés avec les empreintes
+(SQLite, `BOILERPLATE_DB_PATH`), d'un lot et d'une session à l'autre.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from tokenizer import count_tokens
+from document_registry import DocumentRegistry
+from retrieval import is_section_heading
+from metrics import registry, log_event
+from config import BOILERPLATE_DB_PATH, BOILERPLATE_MIN_DOCUMENTS, BOILERPLATE_MIN_TOKENS, BOILERPLATE_SUMMARY_TOKENS
+
+BOILERPLATE_TOKENS_SAVED = registry.counter(
+    "legal_assistant_boilerplate_tokens_saved_total", "Tokens de formules types retirés ou résumés avant résumé.", ("action",)
+)
+
+
+# Intitulé d'un texte (« PROPOSITION DE LOI » puis son objet), cherché dans l'en-tête du document
+_BILL_TYPE_RE = re.compile(r"\b(?:proposition|projet)\s+de\s+loi(?:\s+organique|\s+constitutionnelle)?\b", re.IGNORECASE)
+_BILL_HEADER_LINES = 20
+
+
+def paragraph_hash(paragraph: str) -> str:
+    """Empreinte d'un paragraphe, indépendante de la casse et des espaces."""
+    return hashlib.sha256(" ".join(paragraph.lower().split()).encode("utf-8")).hexdigest()
+
+
+def bill_id(law_text: str) -> str:
+    """
+    Identifiant d'un texte de loi, commun à ses versions (dépôt, texte de la commission,
+    texte adopté, PDF régénéré, texte compacté) : empreinte de son objet (« visant à... »).
+
+    Args:
+        law_text (str): Texte normalisé (un paragraphe par ligne).
+
+    Returns:
+        str: Identifiant du texte ; à défaut d'intitulé reconnu, celui du document.
+    """
+    lines = [line.strip() for line in law_text.split("\n")[:_BILL_HEADER_LINES] if line.strip()]
+    for i, line in enumerate(lines):
+        match = _BILL_TYPE_RE.search(line)
+        if match:
+            # Objet sur la même ligne que le type de document ou sur la suivante
+            subject = line[match.end():].strip() or (lines[i + 1] if i + 1 < len(lines) else "")
+            subject = subject.rstrip(" ,;.")
+            if subject:
+                return DocumentRegistry.compute_doc_id(" ".join(f"{match.group(0)} {subject}".lower().split()))
+    return DocumentRegistry.compute_doc_id(law_text)
+
+
+@dataclass
+class BoilerplateResult:
+    """Texte débarrassé de ses formules types et statistiques du document."""
+    text: str
+    bill_id: str
+    paragraphs: int = 0
+    dropped: int = 0
+    summarized: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def stats(self) -> dict:
+        """Statistiques sérialisables (sans le texte)."""
+        stats = asdict(self)
+        del stats["text"]
+        return {**stats, "tokens_saved": self.tokens_saved}
+
+
+class BoilerplateStore:
+    """
+    Empreintes des paragraphes des documents déjà vus et mini-résumés des formules types.
+
+    Args:
+        path (str): Base SQLite des empreintes.
+        min_documents (int): Nombre de textes distincts (`bill_id`) à partir duquel un paragraphe est une formule type.
+        min_tokens (int): Taille minimale (en tokens) d'un paragraphe pris en compte.
+        summary_tokens (int): Taille (en tokens) à partir de laquelle une formule type est remplacée
+            par son mini-résumé plutôt que retirée.
+    """
+
+    def __init__(
+        self,
+        path: str = BOILERPLATE_DB_PATH,
+        min_documents: int = BOILERPLATE_MIN_DOCUMENTS,
+        min_tokens: int = BOILERPLATE_MIN_TOKENS,
+        summary_tokens: int = BOILERPLATE_SUMMARY_TOKENS,
+    ):
+        self.path = path
+        self.min_documents = min_documents
+        self.min_tokens = min_tokens
+        self.summary_tokens = summary_tokens
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS paragraphs (
+                hash TEXT PRIMARY KEY,
+                text TEXT,
+                tokens INTEGER,
+                summary TEXT
+            )"""
+        )
+        # Ancien schéma (occurrences par version de document) : ses comptes ne sont pas réutilisables
+        self._conn.execute("DROP TABLE IF EXISTS occurrences")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS bill_occurrences (
+                hash TEXT,
+                bill_id TEXT,
+                PRIMARY KEY (hash, bill_id)
+            )"""
+        )
+        self._conn.commit()
+
+    def register(self, bill_id: str, paragraphs: dict) -> dict:
+        """
+        Enregistre les paragraphes d'un texte de loi et retourne leur nombre de textes.
+
+        Args:
+            bill_id (str): Identifiant du texte de loi.
+            paragraphs (dict): Paragraphes indexés par empreinte, avec leur taille en tokens.
+
+        Returns:
+            dict: Nombre de textes distincts contenant chaque paragraphe (ce texte inclus).
+        """
+        hashes = list(paragraphs)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO paragraphs (hash, text, tokens) VALUES (?, ?, ?)",
+                [(h, text, tokens) for h, (text, tokens) in paragraphs.items()],
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO bill_occurrences VALUES (?, ?)", [(h, bill_id) for h in hashes])
+            self._conn.commit()
+            counts = {}
+            # Requêtes par paquets (limite du nombre de paramètres SQLite)
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                counts.update(self._conn.execute(
+                    f"SELECT hash, COUNT(*) FROM bill_occurrences WHERE hash IN ({','.join('?' * len(batch))}) GROUP BY hash",
+                    batch,
+                ).fetchall())
+        return counts
+
+    def summaries(self, hashes: list) -> dict:
+        """Mini-résumés connus des paragraphes, par empreinte."""
+        with self._lock:
+            return dict(self._conn.execute(
+                f"SELECT hash, summary FROM paragraphs WHERE summary IS NOT NULL AND hash IN ({','.join('?' * len(hashes))})",
+                hashes,
+            ).fetchall()) if hashes else {}
+
+    def set_summaries(self, summaries: dict) -> None:
+        """Enregistre les mini-résumés de formules types."""
+        with self._lock:
+            self._conn.executemany("UPDATE paragraphs SET summary = ? WHERE hash = ?", [(s, h) for h, s in summaries.items()])
+            self._conn.commit()
+
+    def remove(self, law_text: str) -> BoilerplateResult:
+        """
+        Retire ou résume les formules types d'un texte de loi (après l'avoir enregistré).
+
+        Args:
+            law_text (str): Texte normalisé (un paragraphe par ligne).
+
+        Returns:
+            BoilerplateResult: Texte allégé et statistiques (tokens économisés).
+        """
+        # Les versions d'un même texte ne comptent qu'une fois : ses propres paragraphes
+        # ne deviennent pas des formules types
+        bill = bill_id(law_text)
+        lines = law_text.split("\n")
+        in_articles = False
+        candidates, line_info = {}, []
+        for line in lines:
+            heading = is_section_heading(line.strip())
+            if heading:
+                in_articles = line.strip().lower().startswith("article")
+            tokens = 0 if heading else count_tokens(line)
+            key = paragraph_hash(line) if tokens >= self.min_tokens else None
+            if key:
+                candidates[key] = (line, tokens)
+            line_info.append((key, tokens, in_articles))
+
+        counts = self.register(bill, candidates)
+        boilerplate = {key for key, count in counts.items() if count >= self.min_documents}
+        to_summarize = {key for key in boilerplate if candidates[key][1] >= self.summary_tokens}
+        summaries = self.summaries(sorted(to_summarize))
+        missing = sorted(to_summarize - set(summaries))
+        if missing:
+            # Import différé : le résumé des formules passe par le LLM
+            from summarizer_agent import summarize_boilerplate
+
+            try:
+                generated = dict(zip(missing, summarize_boilerplate([candidates[key][0] for key in missing])))
+            except Exception as e:
+                # Sans mini-résumé, les formules longues des articles sont conservées telles quelles
+                log_event("boilerplate_summary_failed", logging.WARNING, bill_id=bill, error=str(e))
+            else:
+                self.set_summaries(generated)
+                summaries.update(generated)
+
+        result = BoilerplateResult(text=law_text, bill_id=bill, tokens_before=count_tokens(law_text))
+        kept, saved = [], {"dropped": 0, "summarized": 0}
+        for line, (key, tokens, in_article) in zip(lines, line_info):
+            if key not in boilerplate:
+                kept.append(line)
+                continue
+            summary = summaries.get(key)
+            result.paragraphs += 1
+            replacement = f"[Formule type : {summary}]" if summary else None
+            if replacement and count_tokens(replacement) < tokens:
+                kept.append(replacement)
+                result.summarized += 1
+                saved["summarized"] += tokens - count_tokens(replacement)
+            elif in_article:
+                # Formule courte du dispositif : conservée
+                kept.append(line)
+            else:
+                result.dropped += 1
+                saved["dropped"] += tokens
+        result.text = "\n".join(kept)
+        result.tokens_after = count_tokens(result.text)
+
+        for action, tokens in saved.items():
+            if tokens:
+                BOILERPLATE_TOKENS_SAVED.inc(tokens, action=action)
+        log_event("boilerplate_removed", logging.DEBUG, **result.stats())
+        return result
+
+    def stats(self) -> dict:
+        """
+        Retourne le contenu de la base.
+
+        Returns:
+            dict: Nombre de paragraphes, de textes de loi, de formules types et de mini-résumés.
+        """
+        with self._lock:
+            paragraphs, summaries = self._conn.execute("SELECT COUNT(*), COUNT(summary) FROM paragraphs").fetchone()
+            bills = self._conn.execute("SELECT COUNT(DISTINCT bill_id) FROM bill_occurrences").fetchone()[0]
+            boilerplate = self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT hash FROM bill_occurrences GROUP BY hash HAVING COUNT(*) >= ?)", (self.min_documents,)
+            ).fetchone()[0]
+        return {"paragraphs": paragraphs, "bills": bills, "boilerplate": boilerplate, "summaries": summaries}
+
+
+@lru_cache(maxsize=None)
+def get_boilerplate_store():
+    """
+    Retourne la base globale des formules types, créée au premier appel.
+
+    Returns:
+        BoilerplateStore | None: La base, ou None si le repérage est désactivé (BOILERPLATE_DB_PATH vide).
+    """
+    return BoilerplateStore() if BOILERPLATE_DB_PATH else None
+
+
+def remove_boilerplate(law_text: str) -> BoilerplateResult:
+    """
+    Retire ou résume les formules types d'un texte de loi avant son résumé.
+
+    Args:
+        law_text (str): Texte normalisé (un paragraphe par ligne).
+
+    Returns:
+        BoilerplateResult: Texte allégé et statistiques ; texte inchangé si le repérage est désactivé.
+    """
+    store = get_boilerplate_store()
+    if store is None:
+        tokens = count_tokens(law_text)
+        return BoilerplateResult(text=law_text, bill_id=bill_id(law_text), tokens_before=tokens, tokens_after=tokens)
+    return store.remove(law_text)
@@ -0,0 +1,175 @@
+"""
+Normalisation et compaction des textes de loi extraits des PDF.
+
+- `normalize_text` retire le bruit de mise en page laissé par l'extraction PyPDF2
+  (numéros de page « – 2 – », bandeau « N° 2107 », en-têtes répétés, filets, glyphes de
+  numérotation des alinéas), recolle les mots coupés en fin de ligne et reconstitue
+  les paragraphes.
+- `compact_document` fait tenir un document dans un budget de tokens (mesuré avec le
+  tokenizer du modèle) en retenant les sections les plus informatives (intitulé,
+  exposé des motifs, articles), au lieu de tronquer les premiers caractères.
+
+Les résultats sont mis en cache par empreinte du document.
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from tokenizer import count_tokens
+from document_registry import DocumentRegistry
+from retrieval import is_section_heading, segment_document
+from config import COMPACTION_PASSAGE_TOKENS, COMPACTION_CACHE_SIZE
+
+# Numéro de page (« – 2 – »), seul ou collé en fin de ligne
+_PAGE_NUMBER_RE = re.compile(r"[ \t]*[–-][ \t]*\d{1,4}[ \t]*[–-][ \t]*$", re.MULTILINE)
+# Bandeau du numéro de texte (« N° 2107 »)
+_BANNER_RE = re.compile(r"N°\s*\d+")
+# Bloc des auteurs et du renvoi en commission, sans intérêt pour l'analyse du texte
+_REFERRAL_RE = re.compile(r"^\((?:Renvoy|Transmis)[^\n]*\)$", re.MULTILINE)
+_AUTHORS_RE = re.compile(r"^présentée? par\b.*?\b(?:députée?s?|sénat(?:eur|rice)s?)\.?$", re.MULTILINE | re.DOTALL | re.IGNORECASE)
+
+# Ordre de priorité des sections quand le document dépasse le budget (articles : 2)
+_SECTION_PRIORITY = {"Titre": 0, "Exposé des motifs": 1, "Dispositif": 3}
+_ARTICLE_PRIORITY = 2
+# Intitulés restitués dans le texte compacté (le préambule n'en a pas)
+_SECTION_HEADINGS = {"Titre": "PROPOSITION DE LOI", "Exposé des motifs": "EXPOSÉ DES MOTIFS", "Dispositif": "PROPOSITION DE LOI", "Préambule": None}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(key: tuple, build):
+    """Retourne la valeur en cache pour `key`, calculée par `build()` au premier appel (LRU)."""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    value = build()
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > COMPACTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def _strip_glyphs(line: str) -> str:
+    """Retire les caractères à usage privé (glyphes de numérotation des alinéas)."""
+    return "".join(char for char in line if unicodedata.category(char) != "Co")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\xa0", " ")
+    # Les numéros de page deviennent des sauts de page, pour repérer les en-têtes répétés
+    lines = _PAGE_NUMBER_RE.sub("\n\f", text).split("\n")
+
+    page_headers = {}
+    for position, line in enumerate(lines):
+        if line == "\f":
+            following = next((candidate.strip() for candidate in lines[position + 1:] if candidate.strip()), None)
+            if following and following != "\f":
+                page_headers[following] = page_headers.get(following, 0) + 1
+    repeated_headers = {line for line, count in page_headers.items() if count > 1 and not is_section_heading(line)}
+
+    words = set(re.findall(r"\w+", text.lower()))
+    paragraphs = []
+    current, joinable, current_is_heading = "", False, False
+    for line in lines:
+        line = _strip_glyphs(line)
+        stripped = " ".join(line.split())
+        # Lignes vides, sauts de page, bandeaux, en-têtes et filets (« _____ », « *  * ») :
+        # la phrase en cours continue
+        if not stripped or stripped in repeated_headers or _BANNER_RE.fullmatch(stripped) or not any(char.isalnum() for char in stripped):
+            continue
+        heading = is_section_heading(stripped)
+        if current and joinable and not heading and not current_is_heading:
+            if current.endswith("-") and stripped[0].isalpha():
+                # Mot coupé en fin de ligne : le trait d'union n'est retiré que si le mot
+                # recollé existe ailleurs dans le texte (« Jean-Michel » reste composé)
+                head, tail = re.search(r"(\w*)-$", current).group(1), re.match(r"\w*", stripped).group(0)
+                current = current[:-1] + ("" if (head + tail).lower() in words else "-") + stripped
+            else:
+                current = f"{current} {stripped}"
+        else:
+            if current:
+                paragraphs.append(current)
+            current = stripped
+        # PyPDF2 termine par une espace les lignes coupées à l'intérieur d'un paragraphe
+        joinable = line.endswith((" ", "\t")) or stripped.endswith("-")
+        current_is_heading = heading
+    if current:
+        paragraphs.append(current)
+    return "\n".join(paragraphs)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Nettoie le texte extrait d'un PDF : retire numéros de page, bandeaux, en-têtes
+    répétés et glyphes, recolle les mots coupés et reconstitue les paragraphes
+    (un paragraphe par ligne, intitulés de sections sur leur propre ligne).
+
+    Args:
+        text (str): Texte brut extrait du PDF.
+
+    Returns:
+        str: Texte normalisé.
+    """
+    return _cached(("normalized", DocumentRegistry.compute_doc_id(text)), lambda: _normalize(text))
+
+
+def _compact(text: str, max_tokens: int) -> str:
+    text = normalize_text(text)
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # Le bloc des auteurs et le renvoi en commission n'apportent rien au contenu
+    text = _AUTHORS_RE.sub("", _REFERRAL_RE.sub("", text))
+    passages = segment_document(text, COMPACTION_PASSAGE_TOKENS)
+
+    # Parcours en largeur : le début de chaque section avant la suite des plus longues,
+    # le préambule (assemblée, législature, date de dépôt) en dernier
+    order, rank = [], {}
+    for position, passage in enumerate(passages):
+        rank[passage.section] = rank.get(passage.section, -1) + 1
+        priority = _SECTION_PRIORITY.get(passage.section, _ARTICLE_PRIORITY)
+        order.append((passage.section == "Préambule", rank[passage.section], priority, position))
+
+    selected, used = set(), 0
+    for *_, position in sorted(order):
+        passage = passages[position]
+        # Intitulé de section (une fois par section) et marque d'omission comptés dans le budget
+        cost = count_tokens(passage.text) + count_tokens(passage.section) + 4
+        if used + cost <= max_tokens:
+            selected.add(position)
+            used += cost
+
+    parts, previous = [], None
+    for position in sorted(selected):
+        passage = passages[position]
+        if previous is not None and position != previous + 1:
+            parts.append("[…]")
+        if (previous is None or passages[previous].section != passage.section) and _SECTION_HEADINGS.get(passage.section, passage.section):
+            parts.append(_SECTION_HEADINGS.get(passage.section, passage.section))
+        parts.append(passage.text)
+        previous = position
+    return "\n".join(parts)
+
+
+def compact_document(text: str, max_tokens: int) -> str:
+    """
+    Fait tenir un texte de loi dans un budget de tokens.
+
+    Le texte est d'abord normalisé ; s'il dépasse encore le budget, il est segmenté
+    par sections (intitulé, exposé des motifs, articles) et les passages sont retenus
+    par ordre de priorité : le début de chaque section d'abord, puis la suite. Les
+    passages retenus sont restitués dans l'ordre du document, les coupures étant
+    signalées par « […] ».
+
+    Args:
+        text (str): Texte brut ou normalisé du document.
+        max_tokens (int): Budget de tokens.
+
+    Returns:
+        str: Texte compacté (au plus `max_tokens` tokens).
+    """
+    return _cached(("compact", DocumentRegistry.compute_doc_id(text), max_tokens), lambda: _compact(text, max_tokens))
@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from langfuse.langchain import CallbackHandler
 
 # Charger les variables d'environnement depuis le fichier .env
 if os.path.exists(".env"):
@@ -14,17 +13,97 @@ LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
 LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
 LANGFUSE_BASE_URL = os.getenv("LANGFUSE_BASE_URL")
 
-# Vérifier que les clés API sont définies
+# Vérifier les clés API : les backends optionnels se désactivent au lieu de bloquer le démarrage
+# (OpenAI : erreur au premier appel ; SerpAPI : analyse presse indisponible ; Langfuse : pas de traces)
+LANGFUSE_ENABLED = all([LANGFUSE_SECRET_KEY, LANGFUSE_PUBLIC_KEY, LANGFUSE_BASE_URL])
 if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API Key is missing. Please check your .env file.")
+    print("⚠️ OpenAI API Key is missing. Please check your .env file.")
 if not SERP_API_KEY:
-    raise ValueError("SerpAPI Key is missing. Please check your .env file.")
-if not all([LANGFUSE_SECRET_KEY, LANGFUSE_PUBLIC_KEY, LANGFUSE_BASE_URL]):
-    raise ValueError("Langfuse configuration is missing. Please check your .env file.")
+    print("⚠️ SerpAPI Key is missing: press analysis is disabled.")
+if not LANGFUSE_ENABLED:
+    print("⚠️ Langfuse configuration is missing: tracing is disabled.")
 
 # Configuration de l'application
-MAX_CHARS = 5000  # Nombre maximum de caractères à traiter pour les textes de loi
-
-# Initialiser le handler Langfuse global
-
-langfuse_handler = CallbackHandler()
\ No newline at end of file
+LLM_MODEL = "gpt-4o-mini"  # Modèle partagé par le routeur et les agents
+LLM_TEMPERATURE = 0.1
+TITLE_CONTEXT_TOKENS = 1200  # Budget (en tokens) du texte compacté servant à générer le titre de recherche
+COMPACTION_PASSAGE_TOKENS = 200  # Granularité (en tokens) des passages retenus par la compaction
+COMPACTION_CACHE_SIZE = 128  # Nombre de textes normalisés ou compactés conservés en mémoire
+DOC_PREVIEW_CHARS = 300  # Taille de l'aperçu du document envoyé au LLM routeur
+DOC_REGISTRY_MAX_DOCS = 64  # Nombre maximum de documents conservés en mémoire par le registre
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".cache/pdf")  # Dossier du cache d'extraction PDF
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 50 * 1024 * 1024))  # Taille maximale du cache PDF
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", 1))  # Processus d'extraction PDF (1 = série, 0 = nombre de cœurs ; pool partagé)
+SUMMARY_SINGLE_PASS_TOKENS = 6000  # Au-delà, le résumé est calculé en map-reduce
+SUMMARY_CHUNK_TOKENS = 3000  # Taille (en tokens) des extraits résumés dans l'étape map
+SUMMARY_REDUCE_TOKENS = 6000  # Taille (en tokens) des paquets de résumés fusionnés dans l'étape reduce
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", 8))  # Appels LLM simultanés en map-reduce
+BOILERPLATE_DB_PATH = os.getenv("BOILERPLATE_DB_PATH", ".cache/boilerplate.sqlite")  # Empreintes des paragraphes déjà vus (vide = repérage désactivé)
+BOILERPLATE_MIN_DOCUMENTS = int(os.getenv("BOILERPLATE_MIN_DOCUMENTS", 3))  # Textes de loi distincts (toutes versions confondues) à partir desquels un paragraphe est une formule type
+BOILERPLATE_MIN_TOKENS = 12  # Taille minimale (en tokens) d'un paragraphe comparé entre documents
+BOILERPLATE_SUMMARY_TOKENS = 60  # Au-delà, une formule type est remplacée par son mini-résumé au lieu d'être retirée
+RETRIEVAL_PASSAGE_TOKENS = 400  # Taille maximale (en tokens) d'un passage indexé
+RETRIEVAL_TOP_K = 6  # Nombre de passages envoyés au LLM pour une demande ciblée
+RETRIEVAL_MIN_RELATIVE_SCORE = 0.3  # Score minimal d'un passage retenu, relatif au meilleur passage
+RETRIEVAL_BM25_K1 = 1.5  # BM25 : saturation de la fréquence des termes
+RETRIEVAL_BM25_B = 0.75  # BM25 : normalisation par la longueur des passages
+RETRIEVAL_MAX_INDEXES = 64  # Nombre maximum d'index de documents conservés en mémoire
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")  # Cache des réponses LLM (vide = désactivé)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))  # Durée de vie d'une réponse en cache
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))  # Taille maximale du cache LLM
+NEWS_CACHE_TTL_SECONDS = int(os.getenv("NEWS_CACHE_TTL_SECONDS", 3600))  # Durée de vie d'une recherche de presse en cache
+NEWS_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("NEWS_CACHE_NEGATIVE_TTL_SECONDS", 600))  # Durée de vie d'une recherche sans résultat
+NEWS_CACHE_MAX_ENTRIES = 512  # Nombre maximum de recherches de presse en cache
+NEWS_DIGEST_MAX_ARTICLES = int(os.getenv("NEWS_DIGEST_MAX_ARTICLES", 10))  # Articles (groupes de quasi-doublons) envoyés au LLM d'analyse de ton
+NEWS_MAX_PER_SOURCE = 2  # Articles retenus au maximum par média dans le condensé de presse
+NEWS_DUPLICATE_THRESHOLD = 0.7  # Similarité (Jaccard) minimale entre deux titres de quasi-doublons
+NEWS_MINHASH_PERMUTATIONS = 64  # Longueur des signatures MinHash des titres
+NEWS_MINHASH_BANDS = 16  # Bandes LSH (4 valeurs par bande : 99 % des paires à 0.7 de similarité sont comparées)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", ".cache/sessions.sqlite")  # Checkpoints des conversations (vide = en mémoire)
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 6))  # Nombre maximum d'échanges conservés dans l'historique d'une session
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", 8000))  # Budget (en tokens) de l'historique envoyé au routeur
+SESSION_MAX_TOOL_RESULTS = 16  # Nombre maximum de résultats d'outils réutilisables conservés par session
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))  # Jobs (lectures, analyses) exécutés simultanément, tous utilisateurs confondus
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 32))  # Jobs en attente au maximum (au-delà, les soumissions sont refusées)
+JOB_RETENTION = 256  # Jobs terminés conservés pour consultation
+JOB_SERVER_PORT = int(os.getenv("JOB_SERVER_PORT", 8600))  # Port de l'API HTTP du serveur de jobs (python jobs.py)
+JOB_SERVER_HOST = os.getenv("JOB_SERVER_HOST", "127.0.0.1")  # Adresse d'écoute de l'API de jobs (sans authentification : locale par défaut)
+JOB_SERVER_MAX_BODY_BYTES = int(os.getenv("JOB_SERVER_MAX_BODY_BYTES", 20 * 1024 * 1024))  # Taille maximale d'une requête (PDF ou JSON) ; au-delà : 413
+TOOL_TIMEOUT_SECONDS = int(os.getenv("TOOL_TIMEOUT_SECONDS", 180))  # Délai maximal par défaut d'un outil
+TOOL_TIMEOUTS = {  # Délais maximaux spécifiques par outil (secondes)
+    "summarize_tool": int(os.getenv("SUMMARIZE_TOOL_TIMEOUT_SECONDS", 300)),
+    "tone_analysis_tool": int(os.getenv("TONE_ANALYSIS_TOOL_TIMEOUT_SECONDS", 120)),
+}
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "false").lower() == "true"  # Précharger le chemin presse pendant le routage
+PREFETCH_MAX_WORKERS = 4  # Préchargements spéculatifs simultanés
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # URL de l'API OpenAI (None = URL officielle)
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com")  # URL de l'API SerpAPI
+RATE_LIMITS = {  # Limites par fournisseur (None = pas de limite)
+    "openai": {
+        "requests_per_minute": int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500)),
+        "tokens_per_minute": int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 200000)),
+    },
+    "serpapi": {
+        "requests_per_minute": int(os.getenv("SERPAPI_REQUESTS_PER_MINUTE", 60)),
+        "tokens_per_minute": None,
+    },
+}
+OPENAI_COMPLETION_TOKENS_ESTIMATE = 500  # Tokens de réponse réservés par appel OpenAI
+HTTP_MAX_CONNECTIONS = 20  # Connexions simultanées par fournisseur
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # Connexions keep-alive conservées par fournisseur
+HTTP_TIMEOUT_SECONDS = 120  # Délai maximal d'un appel HTTP sortant
+OUTBOUND_MAX_RETRIES = 4  # Nouvelles tentatives sur 429/5xx et erreurs réseau
+OUTBOUND_BACKOFF_BASE_SECONDS = 0.5  # Délai de base du backoff exponentiel
+OUTBOUND_BACKOFF_MAX_SECONDS = 30  # Délai maximal entre deux tentatives
+BATCH_OUTPUT_PATH = os.getenv("BATCH_OUTPUT_PATH", "batch_results.jsonl")  # Résultats (et point de reprise) du traitement par lots
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))  # Documents traités simultanément par le traitement par lots
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # Niveau des événements structurés (DEBUG pour le détail des recherches)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # Port de l'endpoint local /metrics (0 = désactivé)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Adresse d'écoute de l'endpoint /metrics (locale par défaut)
+METRICS_FILE = os.getenv("METRICS_FILE", "")  # Fichier des métriques écrit à la sortie du processus (vide = désactivé)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # Bornes des histogrammes de durée (s)
+TRACING_MODE = os.getenv("TRACING_MODE", "full").lower()  # Traçage Langfuse : full, sampled ou off
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 0.1))  # Part des requêtes tracées en mode sampled
+TRACING_QUEUE_MAX_SPANS = int(os.getenv("TRACING_QUEUE_MAX_SPANS", 2048))  # Spans en attente d'export (au-delà : abandonnés)
+TRACING_FLUSH_AT = int(os.getenv("TRACING_FLUSH_AT", 512))  # Taille des lots de spans exportés
+TRACING_FLUSH_INTERVAL_SECONDS = float(os.getenv("TRACING_FLUSH_INTERVAL_SECONDS", 5))  # Délai maximal entre deux exports
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from config import DOC_PREVIEW_CHARS, DOC_REGISTRY_MAX_DOCS
+
+# Longueur (en caractères hexadécimaux) des identifiants de document exposés au LLM
+DOC_ID_LENGTH = 16
+
+
+class DocumentRegistry:
+    """
+    Registre des documents indexés par empreinte de contenu (SHA-256).
+
+    Le LLM routeur ne manipule qu'un identifiant court (doc_id) et un aperçu :
+    le texte complet reste côté serveur et est résolu par `tool_node`.
+    """
+
+    def __init__(self, max_docs: int = DOC_REGISTRY_MAX_DOCS):
+        self.max_docs = max_docs
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def compute_doc_id(text: str) -> str:
+        """
+        Calcule l'identifiant d'un document à partir de son contenu.
+
+        Args:
+            text (str): Texte du document.
+
+        Returns:
+            str: Préfixe du hash SHA-256 du texte.
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:DOC_ID_LENGTH]
+
+    def register(self, text: str) -> str:
+        """
+        Enregistre un document et retourne son identifiant.
+        Un même texte enregistré plusieurs fois conserve le même identifiant.
+
+        Args:
+            text (str): Texte du document.
+
+        Returns:
+            str: Identifiant du document.
+        """
+        doc_id = self.compute_doc_id(text)
+        with self._lock:
+            self._documents[doc_id] = text
+            self._documents.move_to_end(doc_id)
+            # Éviction LRU pour borner la mémoire
+            while len(self._documents) > self.max_docs:
+                self._documents.popitem(last=False)
+        return doc_id
+
+    def get(self, doc_id: str) -> str:
+        """
+        Résout un identifiant vers le texte complet du document.
+
+        Args:
+            doc_id (str): Identifiant du document.
+
+        Returns:
+            str: Texte complet du document.
+
+        Raises:
+            KeyError: Si l'identifiant est inconnu.
+        """
+        with self._lock:
+            if doc_id not in self._documents:
+                raise KeyError(f"Document inconnu : {doc_id}")
+            self._documents.move_to_end(doc_id)
+            return self._documents[doc_id]
+
+    def preview(self, doc_id: str, max_chars: int = DOC_PREVIEW_CHARS) -> str:
+        """
+        Retourne un aperçu compact du document, destiné au LLM routeur.
+
+        Args:
+            doc_id (str): Identifiant du document.
+            max_chars (int): Nombre maximum de caractères de l'aperçu.
+
+        Returns:
+            str: Début du document, normalisé sur une seule ligne.
+        """
+        text = " ".join(self.get(doc_id).split())
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars].rsplit(" ", 1)[0] + " […]"
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._documents
+
+
+# Registre global partagé par le pipeline
+document_registry = DocumentRegistry()
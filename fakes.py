@@ -0,0 +1,259 @@
+"""
+Backends locaux et déterministes, utilisés pour les tests et les benchmarks
+à la place des services externes.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from news_search import normalize_query
+
+
+class FakeNewsBackend:
+    """
+    Faux backend de recherche de presse, compatible avec `NewsSearchCache`.
+
+    Args:
+        latency (float): Durée simulée d'un appel (secondes).
+        articles_per_query (int): Nombre d'articles générés par requête.
+        responses (dict): Réponses imposées, indexées par requête normalisée.
+        empty_queries (set): Requêtes (normalisées) qui renvoient une erreur « aucun résultat ».
+    """
+
+    def __init__(self, latency: float = 0.0, articles_per_query: int = 10, responses: dict = None, empty_queries: set = None):
+        self.latency = latency
+        self.articles_per_query = articles_per_query
+        self.responses = {normalize_query(q): r for q, r in (responses or {}).items()}
+        self.empty_queries = {normalize_query(q) for q in (empty_queries or set())}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> dict:
+        with self._lock:
+            self.calls.append(query)
+        if self.latency:
+            time.sleep(self.latency)
+
+        key = normalize_query(query)
+        if key in self.responses:
+            return self.responses[key]
+        if key in self.empty_queries:
+            return {"error": "Google News hasn't returned any results for this query."}
+        return {
+            "news_results": [
+                {
+                    "title": f"{query} : article {i}",
+                    "source": {"name": f"Média {i % 5}"},
+                    "link": f"https://example.org/{key.replace(' ', '-')}/{i}",
+                }
+                for i in range(self.articles_per_query)
+            ]
+        }
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Faux modèle de chat déterministe, à latence et débit de tokens configurables.
+
+    - Lié à des outils (routeur), il choisit les outils d'après des mots-clés de la
+      dernière demande (« résum », « presse », « média », « les deux ») et leur passe
+      le doc_id trouvé dans le message.
+    - Sinon, il génère `completion_tokens` mots, diffusés en streaming au rythme de
+      `tokens_per_second` après `first_token_latency` secondes.
+
+    Args:
+        first_token_latency (float): Délai avant le premier token (secondes).
+        tokens_per_second (float): Débit de génération (0 = instantané).
+        completion_tokens (int): Nombre de tokens (mots) générés par réponse.
+    """
+
+    first_token_latency: float = 0.0
+    tokens_per_second: float = 0.0
+    completion_tokens: int = 50
+    # Les décisions de routage sont renvoyées d'un bloc, comme avec disable_streaming
+    disable_streaming: str = "tool_calling"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    @staticmethod
+    def _usage(messages, completion_tokens: int) -> dict:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def _route(self, messages, tools: list) -> AIMessage:
+        """Choisit les outils d'après la dernière demande de l'utilisateur."""
+        request = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        doc_id = re.search(r"doc_id\)\s*:\s*(\S+)", request)
+        lowered = request.lower()
+        names = {tool["function"]["name"] for tool in tools}
+        wanted = []
+        if "summarize_tool" in names and ("résum" in lowered or "les deux" in lowered):
+            wanted.append("summarize_tool")
+        if "tone_analysis_tool" in names and any(word in lowered for word in ("presse", "média", "les deux")):
+            wanted.append("tone_analysis_tool")
+        tool_calls = [
+            {"name": name, "args": {"doc_id": doc_id.group(1) if doc_id else ""}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+            for name in wanted
+        ]
+        return AIMessage(content="" if tool_calls else "Aucun outil nécessaire.", tool_calls=tool_calls, usage_metadata=self._usage(messages, 10 * len(tool_calls)))
+
+    def _tokens(self) -> list:
+        return [f"mot{i}" if i else "Réponse" for i in range(self.completion_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.first_token_latency)
+        if kwargs.get("tools"):
+            message = self._route(messages, kwargs["tools"])
+        else:
+            if self.tokens_per_second:
+                time.sleep(self.completion_tokens / self.tokens_per_second)
+            message = AIMessage(content=" ".join(self._tokens()), usage_metadata=self._usage(messages, self.completion_tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.first_token_latency)
+        tokens = self._tokens()
+        for i, token in enumerate(tokens):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            content = token if i == len(tokens) - 1 else token + " "
+            usage = self._usage(messages, self.completion_tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=content, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
+
+
+class FakeProviderServer:
+    """
+    Faux serveur HTTP local imitant les API OpenAI (chat completions) et SerpAPI,
+    pour tester la couche sortante (`outbound.py`) sans appel réseau externe.
+
+    Pointer OPENAI_BASE_URL et SERPAPI_BASE_URL vers `server.url` pour l'utiliser.
+
+    Args:
+        latency (float): Durée simulée de chaque réponse (secondes).
+        fail_first (int): Nombre de premières requêtes rejetées en 429 (test des retries).
+        retry_after (float): Valeur de l'en-tête Retry-After des réponses 429.
+        completion (str): Contenu des réponses de chat.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0, retry_after: float = 0.05, completion: str = "Réponse simulée."):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.completion = completion
+        self.news_backend = FakeNewsBackend()
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _should_fail(self) -> bool:
+                with fake._lock:
+                    fake.requests.append(self.path)
+                    if fake.fail_first > 0:
+                        fake.fail_first -= 1
+                        return True
+                return False
+
+            def do_GET(self):
+                if self._should_fail():
+                    self._send_json(429, {"error": "rate limited"}, {"Retry-After": str(fake.retry_after)})
+                    return
+                time.sleep(fake.latency)
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                self._send_json(200, fake.news_backend.search(query))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self._should_fail():
+                    self._send_json(429, {"error": {"message": "rate limited"}}, {"Retry-After": str(fake.retry_after)})
+                    return
+                time.sleep(fake.latency)
+                prompt_tokens = sum(len(str(m.get("content") or "")) for m in request.get("messages", [])) // 4
+                completion_tokens = len(fake.completion) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+                base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": request.get("model", "fake")}
+                if not request.get("stream"):
+                    self._send_json(200, {
+                        **base,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": fake.completion}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+                # Réponse en streaming (Server-Sent Events), un mot par chunk
+                events = [
+                    {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}]}
+                    for word in fake.completion.split(" ")
+                ]
+                events.append({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+                body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "FakeProviderServer":
+        """Démarre le serveur sur un port libre de 127.0.0.1 (dans un thread)."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Arrête le serveur."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,469 @@
+"""
+Serveur de jobs : lecture des documents et analyses exécutées en tâches asynchrones.
+
+Un seul gestionnaire par processus, partagé par toutes les sessions Streamlit : une boucle
+asyncio (thread dédié) fait tourner `JOB_WORKERS` workers qui consomment une file bornée
+(`JOB_QUEUE_SIZE`). Quand la file est pleine, la soumission est refusée (`JobQueueFullError`)
+au lieu d'accumuler du travail : la concurrence totale ne dépend plus du nombre d'utilisateurs.
+
+Chaque job peut être suivi par interrogation (`get`, événements à partir d'un curseur), en
+flux (`stream`) ou attendu (`wait`), et annulé (`cancel`). Les analyses passent par
+`astream_agent_with_law_text` (exécution asynchrone du graphe).
+
+Le même gestionnaire peut être exposé en HTTP (JSON) pour d'autres processus :
+    python jobs.py [--port 8600] [--workers 4] [--queue-size 32]
+
+    POST   /documents        corps : PDF          → 202 {"job_id": ...}
+    POST   /analyses         {"sha256" | "law_text", "request", "session_id"?, "max_tokens"?}
+    GET    /jobs/<id>?since=N                     → statut, événements depuis N, résultat
+    DELETE /jobs/<id>                             → annulation
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from metrics import registry, log_event
+from pdf_cache import pdf_cache, hash_pdf_bytes
+from config import JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RETENTION, JOB_SERVER_PORT, JOB_SERVER_HOST, JOB_SERVER_MAX_BODY_BYTES
+
+FINISHED_STATUSES = ("success", "error", "cancelled")
+
+JOBS = registry.counter("legal_assistant_jobs_total", "Jobs terminés ou refusés.", ("kind", "status"))
+JOB_WAIT_SECONDS = registry.histogram("legal_assistant_job_wait_seconds", "Attente des jobs dans la file.", ("kind",))
+JOB_RUN_SECONDS = registry.histogram("legal_assistant_job_duration_seconds", "Durée d'exécution des jobs.", ("kind", "status"))
+
+
+class JobQueueFullError(RuntimeError):
+    """La file de jobs est pleine : la demande doit être soumise à nouveau plus tard."""
+
+
+class JobFailedError(RuntimeError):
+    """Le job s'est terminé en erreur ou a été annulé."""
+
+
+@dataclass
+class Job:
+    """Job soumis au gestionnaire : statut, événements de progression et résultat."""
+    id: str
+    kind: str
+    run: object
+    status: str = "queued"
+    events: list = field(default_factory=list)
+    result: object = None
+    error: str = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+    task: object = None
+
+    def snapshot(self, since: int = 0) -> dict:
+        """État du job sérialisable en JSON, avec les événements à partir de l'index `since`."""
+        result = self.result
+        if result is not None and self.kind == "document":
+            result = {"sha256": result.sha256, "page_count": result.page_count, "chars": len(result.text)}
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "events": self.events[since:],
+            "next": len(self.events),
+            "result": result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    File de jobs bornée et pool de workers asyncio, démarrés au premier job soumis.
+
+    Args:
+        workers (int): Nombre de jobs exécutés simultanément.
+        queue_size (int): Nombre maximum de jobs en attente.
+        retention (int): Nombre de jobs terminés conservés pour consultation.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE, retention: int = JOB_RETENTION):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retention = retention
+        self._jobs = OrderedDict()
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+
+    def _ensure_started(self) -> None:
+        """Démarre la boucle asyncio et les workers (une seule fois)."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._queue = asyncio.Queue(maxsize=self.queue_size)
+                for _ in range(max(self.workers, 1)):
+                    loop.create_task(self._worker())
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name="job-manager", daemon=True).start()
+            ready.wait()
+            self._loop = loop
+            log_event("job_manager_started", workers=self.workers, queue_size=self.queue_size)
+
+    async def _enqueue(self, job: Job) -> None:
+        self._queue.put_nowait(job)
+
+    def _submit(self, kind: str, run) -> str:
+        """Enregistre un job et le place dans la file (refusé si elle est pleine)."""
+        self._ensure_started()
+        job = Job(id=uuid.uuid4().hex, kind=kind, run=run)
+        with self._condition:
+            self._jobs[job.id] = job
+        try:
+            asyncio.run_coroutine_threadsafe(self._enqueue(job), self._loop).result()
+        except asyncio.QueueFull:
+            with self._condition:
+                del self._jobs[job.id]
+            JOBS.inc(kind=kind, status="rejected")
+            raise JobQueueFullError(f"File de jobs pleine ({self.queue_size} en attente) : réessayez dans quelques instants.")
+        log_event("job_submitted", job_id=job.id, kind=kind, queued=self._queue.qsize())
+        return job.id
+
+    def submit_document(self, data: bytes) -> str:
+        """
+        Soumet la lecture d'un PDF (extraction et indexation, via le cache disque).
+
+        Args:
+            data (bytes): Contenu du PDF.
+
+        Returns:
+            str: Identifiant du job (résultat : `PdfExtraction`).
+        """
+        async def run(job):
+            from pipeline import extract_pdf
+
+            return await asyncio.to_thread(extract_pdf, data)
+
+        return self._submit("document", run)
+
+    def read_document(self, data: bytes):
+        """
+        Lit un PDF en attendant le résultat : une extraction déjà en cache disque est servie
+        directement, sans passer par la file partagée avec les analyses ; seule une vraie
+        analyse du PDF est soumise comme job.
+
+        Args:
+            data (bytes): Contenu du PDF.
+
+        Returns:
+            PdfExtraction: Texte par page, métadonnées et index de recherche.
+
+        Raises:
+            JobQueueFullError: La file est pleine (document absent du cache).
+            JobFailedError: L'extraction a échoué.
+        """
+        if pdf_cache.contains(hash_pdf_bytes(data)):
+            from pipeline import extract_pdf
+
+            return extract_pdf(data)
+        return self.wait(self.submit_document(data))
+
+    def submit_analysis(self, law_text: str, user_request: str, session_id: str = None, max_tokens: int = None) -> str:
+        """
+        Soumet une demande à l'agent.
+
+        Args:
+            law_text (str): Texte de la loi.
+            user_request (str): Demande de l'utilisateur.
+            session_id (str): Identifiant de la session de l'utilisateur (conversation suivie).
+            max_tokens (int): Budget de tokens du texte traité (None : document complet).
+
+        Returns:
+            str: Identifiant du job (événements : ceux de `stream_agent_with_law_text`,
+                résultat : réponse Markdown).
+        """
+        async def run(job):
+            from pipeline import astream_agent_with_law_text
+
+            response = None
+            async for event in astream_agent_with_law_text(law_text, user_request, max_tokens=max_tokens, session_id=session_id):
+                with self._condition:
+                    job.events.append(event)
+                    self._condition.notify_all()
+                if event["type"] == "done":
+                    response = event["response"]
+            return response
+
+        return self._submit("analysis", run)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            except Exception as e:
+                log_event("job_worker_error", job_id=job.id, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        with self._condition:
+            if job.status == "cancelled":
+                return
+            # Tâche propre au job : l'annuler n'interrompt pas le worker
+            job.task = asyncio.ensure_future(job.run(job))
+            job.status, job.started_at = "running", time.time()
+            self._condition.notify_all()
+        JOB_WAIT_SECONDS.observe(job.started_at - job.created_at, kind=job.kind)
+
+        result, error, status = None, None, "success"
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            status = "cancelled"
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+        self._finish(job, status, result, error)
+
+    def _finish(self, job: Job, status: str, result=None, error: str = None) -> None:
+        """Termine un job, réveille les clients en attente et purge les plus anciens jobs terminés."""
+        with self._condition:
+            job.status, job.result, job.error, job.finished_at = status, result, error, time.time()
+            finished = [job_id for job_id, other in self._jobs.items() if other.status in FINISHED_STATUSES]
+            for job_id in finished[:max(len(finished) - self.retention, 0)]:
+                del self._jobs[job_id]
+            self._condition.notify_all()
+        if job.started_at is not None:
+            JOB_RUN_SECONDS.observe(job.finished_at - job.started_at, kind=job.kind, status=status)
+        JOBS.inc(kind=job.kind, status=status)
+        log_event("job_finished", job_id=job.id, kind=job.kind, status=status, error=error)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Annule un job en attente ou en cours. Les appels déjà lancés dans des threads
+        (LLM, recherche de presse) vont à leur terme, mais leur résultat est ignoré.
+
+        Args:
+            job_id (str): Identifiant du job.
+
+        Returns:
+            bool: True si le job a été annulé, False s'il est inconnu ou déjà terminé.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            if job.status == "running":
+                self._loop.call_soon_threadsafe(job.task.cancel)
+                return True
+        # Job encore dans la file : le worker l'ignorera
+        self._finish(job, "cancelled")
+        return True
+
+    def get(self, job_id: str, since: int = 0) -> dict:
+        """
+        Interroge un job (polling).
+
+        Args:
+            job_id (str): Identifiant du job.
+            since (int): Index du premier événement à retourner (champ "next" de la réponse précédente).
+
+        Returns:
+            dict: Statut, nouveaux événements, résultat ou erreur.
+
+        Raises:
+            KeyError: Job inconnu (ou purgé).
+        """
+        with self._condition:
+            return self._jobs[job_id].snapshot(since)
+
+    def stream(self, job_id: str, cancel_on_close: bool = True):
+        """
+        Produit les événements d'un job au fur et à mesure, jusqu'à sa fin.
+
+        Args:
+            job_id (str): Identifiant du job.
+            cancel_on_close (bool): Annuler le job si le client abandonne le flux avant la fin
+                (par exemple une page Streamlit relancée).
+
+        Yields:
+            dict: Événements du job.
+
+        Raises:
+            JobFailedError: Le job s'est terminé en erreur ou a été annulé.
+        """
+        position, status = 0, None
+        try:
+            while True:
+                with self._condition:
+                    job = self._jobs[job_id]
+                    self._condition.wait_for(lambda: len(job.events) > position or job.status in FINISHED_STATUSES)
+                    events, status = job.events[position:], job.status
+                position += len(events)
+                yield from events
+                if status in FINISHED_STATUSES and position == len(job.events):
+                    break
+        finally:
+            if cancel_on_close and status not in FINISHED_STATUSES:
+                self.cancel(job_id)
+        if status != "success":
+            raise JobFailedError(job.error or "Job annulé.")
+
+    def wait(self, job_id: str, timeout: float = None):
+        """
+        Attend la fin d'un job et retourne son résultat.
+
+        Args:
+            job_id (str): Identifiant du job.
+            timeout (float): Délai maximal d'attente (secondes, None : illimité).
+
+        Returns:
+            Résultat du job.
+
+        Raises:
+            TimeoutError: Le job n'est pas terminé dans le délai.
+            JobFailedError: Le job s'est terminé en erreur ou a été annulé.
+        """
+        with self._condition:
+            job = self._jobs[job_id]
+            if not self._condition.wait_for(lambda: job.status in FINISHED_STATUSES, timeout=timeout):
+                raise TimeoutError(f"Job {job_id} non terminé après {timeout} s.")
+        if job.status != "success":
+            raise JobFailedError(job.error or "Job annulé.")
+        return job.result
+
+    def stats(self) -> dict:
+        """Nombre de jobs par statut et capacité du gestionnaire."""
+        with self._condition:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "queue_size": self.queue_size, **counts}
+
+
+# Gestionnaire partagé par toutes les sessions du processus
+job_manager = JobManager()
+
+
+def start_job_server(port: int = JOB_SERVER_PORT, manager: JobManager = job_manager, host: str = JOB_SERVER_HOST) -> ThreadingHTTPServer:
+    """
+    Expose un gestionnaire de jobs en HTTP (JSON), dans un thread de fond.
+    L'API n'est pas authentifiée : elle n'écoute par défaut que les connexions locales.
+
+    Args:
+        port (int): Port d'écoute.
+        manager (JobManager): Gestionnaire exposé.
+        host (str): Adresse d'écoute.
+
+    Returns:
+        ThreadingHTTPServer: Serveur démarré.
+    """
+    class JobHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_id(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                self._send(400, {"error": "En-tête Content-Length invalide."})
+                return
+            if length > JOB_SERVER_MAX_BODY_BYTES:
+                # Corps non lu : la connexion est fermée après la réponse
+                self.close_connection = True
+                self._send(413, {"error": f"Requête trop volumineuse (maximum {JOB_SERVER_MAX_BODY_BYTES} octets)."})
+                return
+            body = self.rfile.read(length)
+            path = urlparse(self.path).path.rstrip("/")
+            try:
+                if path == "/documents":
+                    job_id = manager.submit_document(body)
+                elif path == "/analyses":
+                    request = json.loads(body or b"{}")
+                    law_text = request.get("law_text")
+                    if law_text is None and request.get("sha256"):
+                        extraction = pdf_cache.get(request["sha256"])
+                        law_text = extraction.text if extraction is not None else None
+                    if law_text is None or not request.get("request"):
+                        self._send(400, {"error": "Champs requis : 'request' et 'law_text' ou 'sha256' d'un document lu."})
+                        return
+                    job_id = manager.submit_analysis(law_text, request["request"], request.get("session_id"), request.get("max_tokens"))
+                else:
+                    self._send(404, {"error": "Ressource inconnue."})
+                    return
+            except JobQueueFullError as e:
+                self._send(429, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(202, {"job_id": job_id})
+
+        def do_GET(self):
+            if urlparse(self.path).path.rstrip("/") == "/jobs":
+                self._send(200, manager.stats())
+                return
+            job_id = self._job_id()
+            try:
+                since = int(parse_qs(urlparse(self.path).query).get("since", ["0"])[0])
+                self._send(200, manager.get(job_id, since))
+            except ValueError:
+                self._send(400, {"error": "Paramètre 'since' invalide."})
+            except KeyError:
+                self._send(404, {"error": f"Job inconnu : {job_id}"})
+
+        def do_DELETE(self):
+            job_id = self._job_id()
+            self._send(200, {"job_id": job_id, "cancelled": manager.cancel(job_id)})
+
+    server = ThreadingHTTPServer((host, port), JobHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log_event("job_server_started", host=host, port=port)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=JOB_SERVER_PORT)
+    parser.add_argument("--host", default=JOB_SERVER_HOST, help="Adresse d'écoute (API non authentifiée)")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="Jobs exécutés simultanément")
+    parser.add_argument("--queue-size", type=int, default=JOB_QUEUE_SIZE, help="Jobs en attente au maximum")
+    args = parser.parse_args()
+
+    manager = JobManager(workers=args.workers, queue_size=args.queue_size)
+    server = start_job_server(args.port, manager, args.host)
+    print(f"🧵 Serveur de jobs sur {args.host}:{args.port} ({args.workers} workers, file de {args.queue_size})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES
+
+
+def _parse_llm_string(llm_string: str) -> tuple:
+    """
+    Extrait le nom du modèle et la température de la description sérialisée du LLM.
+
+    Args:
+        llm_string (str): Chaîne fournie par LangChain (paramètres du modèle).
+
+    Returns:
+        tuple[str, float | None]: Nom du modèle et température.
+    """
+    try:
+        kwargs = json.loads(llm_string.split("---", 1)[0]).get("kwargs", {})
+    except ValueError:
+        return "", None
+    return kwargs.get("model_name") or kwargs.get("model", ""), kwargs.get("temperature")
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Cache persistant (SQLite) des réponses LLM, branché via le paramètre `cache` des modèles LangChain.
+
+    La clé combine le modèle, la température, les autres paramètres d'appel et le
+    hash du prompt rendu (qui contient l'entrée). Les entrées expirent après
+    `ttl_seconds` et les moins récemment utilisées sont supprimées au-delà de `max_bytes`.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                temperature REAL,
+                prompt_hash TEXT,
+                value TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_access REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> tuple:
+        """Calcule la clé du cache et le hash du prompt."""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key = hashlib.sha256(f"{llm_string}\x00{prompt_hash}".encode("utf-8")).hexdigest()
+        return key, prompt_hash
+
+    def lookup(self, prompt: str, llm_string: str):
+        """Retourne les générations en cache pour ce prompt et ce modèle, ou None."""
+        key, _ = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        generations = loads(row[0], allowed_objects="core")
+        # Marque les réponses servies par le cache (les tokens n'ont pas été consommés)
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cached": True}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        """Enregistre les générations produites pour ce prompt et ce modèle."""
+        key, prompt_hash = self._key(prompt, llm_string)
+        model, temperature = _parse_llm_string(llm_string)
+        value = dumps(return_val)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, temperature, prompt_hash, value, len(value), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de la taille maximale."""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", to_delete)
+
+    def clear(self, **kwargs) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Retourne les compteurs du cache.
+
+        Returns:
+            dict: Nombre de hits, de misses, d'entrées et taille totale (octets).
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size}
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache():
+    """
+    Retourne le cache global partagé par les modèles, créé au premier appel.
+
+    Returns:
+        SQLiteLLMCache | None: Le cache, ou None s'il est désactivé (LLM_CACHE_PATH vide).
+    """
+    return SQLiteLLMCache() if LLM_CACHE_PATH else None
@@ -0,0 +1,58 @@
+from functools import lru_cache
+from llm_cache import get_llm_cache
+from outbound import get_http_client, get_async_http_client
+from metrics import metrics_callback_handler
+from config import LLM_MODEL, LLM_TEMPERATURE, OPENAI_BASE_URL
+
+
+# Modèle de remplacement (faux modèle des benchmarks), prioritaire sur le client OpenAI
+_llm_override = None
+
+
+def set_llm_override(llm) -> None:
+    """
+    Remplace le client LLM partagé (par exemple par `fakes.FakeChatModel` dans les benchmarks).
+
+    Args:
+        llm: Modèle de chat LangChain à utiliser, ou None pour revenir au client OpenAI.
+    """
+    global _llm_override
+    _llm_override = llm
+
+
+def get_llm():
+    """
+    Retourne le client LLM partagé par le routeur et les agents (ou le modèle de remplacement).
+
+    Returns:
+        BaseChatModel: Client LLM.
+    """
+    if _llm_override is not None:
+        return _llm_override
+    return _build_openai_llm()
+
+
+@lru_cache(maxsize=None)
+def _build_openai_llm():
+    """
+    Construit le client OpenAI partagé au premier appel.
+    L'import de langchain_openai (coûteux) est différé jusqu'à ce premier appel.
+    Les appels passent par la couche sortante commune (pool de connexions, limites de débit,
+    retries avec backoff) : les retries internes du SDK OpenAI sont donc désactivés.
+
+    Returns:
+        ChatOpenAI: Client LLM (avec cache des réponses).
+    """
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        cache=get_llm_cache(),
+        base_url=OPENAI_BASE_URL,
+        http_client=get_http_client("openai"),
+        http_async_client=get_async_http_client("openai"),
+        max_retries=0,
+        # Durée et tokens de chaque appel, dans les métriques locales
+        callbacks=[metrics_callback_handler]
+    )
@@ -0,0 +1,311 @@
+"""
+Métriques locales (sans dépendance à Langfuse) et événements structurés.
+
+- Histogrammes de durée et compteurs, avec labels, exposés au format texte Prometheus
+  sur un endpoint local (`METRICS_PORT`) et/ou écrits dans un fichier à la sortie (`METRICS_FILE`).
+- Événements structurés (une ligne JSON par événement) sur le logger "legal_assistant",
+  filtrés par niveau (`LOG_LEVEL`).
+"""
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.callbacks import BaseCallbackHandler
+from config import LOG_LEVEL, METRICS_PORT, METRICS_HOST, METRICS_FILE, METRICS_BUCKETS
+
+# Logger des événements structurés
+logger = logging.getLogger("legal_assistant")
+logger.setLevel(LOG_LEVEL)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, **fields) -> None:
+    """
+    Émet un événement structuré (JSON) s'il passe le niveau de log configuré.
+
+    Args:
+        event (str): Nom de l'événement.
+        level (int): Niveau de log (logging.DEBUG, logging.INFO, ...).
+        **fields: Champs de l'événement.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Metric:
+    """Métrique nommée, dont les valeurs sont indexées par combinaison de labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Compteur monotone, par combinaison de labels."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Incrémente le compteur pour les labels donnés."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        """Retourne les échantillons (nom, labels, valeur) au format Prometheus."""
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Histogramme de durées (secondes) à buckets fixes, par combinaison de labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = METRICS_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Enregistre une observation pour les labels donnés."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc ; le label "status" vaut "error" si le bloc lève une exception."""
+        started_at = time.perf_counter()
+        status = "success"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            if "status" in self.labelnames:
+                labels = {**labels, "status": status}
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def samples(self) -> list:
+        """Retourne les échantillons (buckets cumulés, somme, nombre) au format Prometheus."""
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": f"{bound:g}"}, cumulative))
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Ensemble des métriques de l'application, rendu au format texte Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, description: str, labelnames: tuple = ()) -> Counter:
+        """Retourne le compteur `name` (créé au premier appel)."""
+        return self._register(Counter, name, description, labelnames)
+
+    def histogram(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = METRICS_BUCKETS) -> Histogram:
+        """Retourne l'histogramme `name` (créé au premier appel)."""
+        return self._register(Histogram, name, description, labelnames, buckets)
+
+    def render(self) -> str:
+        """
+        Rend toutes les métriques au format texte d'exposition Prometheus.
+
+        Returns:
+            str: Texte d'exposition.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registre global et métriques de l'application
+registry = MetricsRegistry()
+STAGE_SECONDS = registry.histogram("legal_assistant_stage_duration_seconds", "Durée des étapes du pipeline.", ("stage", "status"))
+PDF_CACHE_LOOKUPS = registry.counter("legal_assistant_pdf_cache_lookups_total", "Recherches dans le cache d'extraction PDF.", ("result",))
+TOOL_SECONDS = registry.histogram("legal_assistant_tool_duration_seconds", "Durée d'exécution des outils.", ("tool", "status"))
+LLM_CALL_SECONDS = registry.histogram("legal_assistant_llm_call_duration_seconds", "Durée des appels LLM.", ("model", "status"))
+LLM_TOKENS = registry.counter("legal_assistant_llm_tokens_total", "Tokens des appels LLM (prompt, completion ; cached : réponses du cache, non consommés).", ("model", "kind"))
+SERPAPI_CALL_SECONDS = registry.histogram("legal_assistant_serpapi_call_duration_seconds", "Durée des appels SerpAPI.", ("status",))
+
+
+def timed(stage: str):
+    """
+    Décorateur : mesure chaque appel de la fonction dans l'histogramme des étapes.
+
+    Args:
+        stage (str): Nom de l'étape (label "stage").
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Callback LangChain : durée, statut et tokens (prompt/réponse) de chaque appel LLM."""
+
+    def __init__(self):
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or params.get("_type", "unknown")
+        self._runs[run_id] = (model, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, started_at = self._runs.pop(run_id, ("unknown", None))
+        if started_at is not None:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started_at, model=model, status="success")
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # Réponses diffusées en streaming ou servies par le cache : usage porté par le message
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens, completion_tokens = usage.get("input_tokens"), usage.get("output_tokens")
+        if prompt_tokens is None:
+            return
+        if (getattr(generation, "generation_info", None) or {}).get("cached"):
+            # Réponse du cache LLM : tokens comptés à part, ils n'ont pas été consommés
+            LLM_TOKENS.inc(prompt_tokens + (completion_tokens or 0), model=model, kind="cached")
+        else:
+            LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+            LLM_TOKENS.inc(completion_tokens or 0, model=model, kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, started_at = self._runs.pop(run_id, ("unknown", None))
+        if started_at is not None:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started_at, model=model, status="error")
+
+
+# Handler partagé, attaché au client LLM
+metrics_callback_handler = MetricsCallbackHandler()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """
+    Démarre (une seule fois par processus) l'endpoint local `/metrics` au format Prometheus.
+
+    Args:
+        port (int): Port d'écoute (0 : endpoint désactivé).
+        host (str): Adresse d'écoute.
+
+    Returns:
+        ThreadingHTTPServer | None: Serveur démarré, ou None s'il est désactivé.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        log_event("metrics_server_started", host=host, port=port)
+        return _server
+
+
+def dump_metrics(path: str = METRICS_FILE) -> None:
+    """
+    Écrit les métriques au format texte Prometheus dans un fichier (écriture atomique).
+
+    Args:
+        path (str): Fichier de sortie.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+# Écrire les métriques dans METRICS_FILE à la fin du processus (batch, benchmarks)
+if METRICS_FILE:
+    atexit.register(dump_metrics)
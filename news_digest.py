@@ -0,0 +1,248 @@
+"""
+Condensé des résultats de recherche de presse envoyé au LLM d'analyse de ton.
+
+Les dépêches reprises par plusieurs médias (AFP, Reuters...) occupent souvent la moitié
+des résultats sous des titres presque identiques. Tous les articles de la recherche (y
+compris les « stories » regroupées par Google News) sont dédoublonnés, les quasi-doublons
+regroupés (MinHash sur les 5-grammes de caractères des titres, candidats par LSH), puis les
+groupes sont sélectionnés en diversifiant les sources.
+Chaque groupe est envoyé une seule fois, avec sa taille (volume de reprise) et les autres
+médias qui l'ont repris.
+"""
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from dataclasses import dataclass, field
+from config import (
+    NEWS_DIGEST_MAX_ARTICLES,
+    NEWS_MAX_PER_SOURCE,
+    NEWS_DUPLICATE_THRESHOLD,
+    NEWS_MINHASH_PERMUTATIONS,
+    NEWS_MINHASH_BANDS,
+)
+
+_SHINGLE_SIZE = 5
+# Rubriques et mentions d'agence ajoutées par les médias qui reprennent une dépêche
+_TITLE_NOISE_RE = re.compile(
+    r"^(?:vid[ée]o|direct|en direct|info|replay|exclusif|podcast)\s*[.:\-–]\s*|\s*(?:\((?:afp|reuters)\)|[-–]\s*(?:afp|reuters))$",
+    re.IGNORECASE,
+)
+# Nombre premier de Mersenne 2^31 - 1 : a * x + b tient dans un entier 64 bits (x < 2^32)
+_MERSENNE_PRIME = (1 << 31) - 1
+_MINHASH_SEED = 1
+# Autres médias cités pour une dépêche reprise (au-delà : « +N »)
+_MAX_OTHER_SOURCES = 3
+
+
+@dataclass
+class NewsItem:
+    """Article retenu dans le condensé, représentant d'un groupe de quasi-doublons."""
+    title: str
+    source: str
+    link: str
+    cluster_size: int = 1
+    other_sources: list = field(default_factory=list)
+
+    def render(self) -> str:
+        line = f"{self.source} — {self.title}"
+        if self.cluster_size > 1:
+            others = ", ".join(self.other_sources[:_MAX_OTHER_SOURCES])
+            if len(self.other_sources) > _MAX_OTHER_SOURCES:
+                others += f" +{len(self.other_sources) - _MAX_OTHER_SOURCES}"
+            others = f" : {others}" if others else ""
+            line += f" (×{self.cluster_size}, repris{others})"
+        return line
+
+
+@dataclass
+class NewsDigest:
+    """Condensé des résultats : articles retenus et volume de la couverture."""
+    items: list
+    articles: int
+    clusters: int
+    sources: int
+
+    def render(self) -> str:
+        """Texte envoyé au LLM (un article par ligne, sans les liens)."""
+        return "\n".join(f"{i}. {item.render()}" for i, item in enumerate(self.items, 1))
+
+
+def _source_name(article: dict) -> str:
+    source = article.get("source", {})
+    if isinstance(source, dict):
+        return source.get("name", "Source inconnue")
+    return str(source) if source else "Source inconnue"
+
+
+def flatten_articles(results: dict) -> list:
+    """
+    Extrait les articles d'une réponse de recherche, y compris ceux des « stories »
+    regroupées par Google News (article principal et articles liés).
+
+    Args:
+        results (dict): Réponse brute du backend de recherche.
+
+    Returns:
+        list[dict]: Articles (titre, source, lien) sans lien en double, dans l'ordre de pertinence.
+    """
+    articles, seen_links = [], set()
+    for result in results.get("news_results", results.get("articles", [])):
+        for article in [result.get("highlight") or result] + list(result.get("stories", [])):
+            link = article.get("link")
+            if article.get("title") and link not in seen_links:
+                if link:
+                    seen_links.add(link)
+                articles.append({
+                    "title": article["title"].strip(),
+                    "source": _source_name(article),
+                    "link": link or "Lien non disponible",
+                })
+    return articles
+
+
+def _shingles(article: dict) -> set:
+    """5-grammes de caractères du titre normalisé (sans accents, ponctuation, rubrique ni nom du média)."""
+    title = article["title"]
+    # Google News ajoute parfois « - Nom du média » en fin de titre
+    suffix = f" - {article['source']}"
+    if title.endswith(suffix):
+        title = title[:-len(suffix)]
+    title = _TITLE_NOISE_RE.sub("", title)
+    title = unicodedata.normalize("NFKD", title.lower())
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    title = " ".join(re.findall(r"\w+", title))
+    if len(title) <= _SHINGLE_SIZE:
+        return {title}
+    return {title[i:i + _SHINGLE_SIZE] for i in range(len(title) - _SHINGLE_SIZE + 1)}
+
+
+@lru_cache(maxsize=4)
+def _permutations(count: int) -> tuple:
+    """Coefficients (a, b) des fonctions de hachage a * x + b mod p, fixés par la graine."""
+    import numpy as np
+
+    rng = np.random.default_rng(_MINHASH_SEED)
+    return (
+        rng.integers(1, _MERSENNE_PRIME, size=count, dtype=np.uint64),
+        rng.integers(0, _MERSENNE_PRIME, size=count, dtype=np.uint64),
+    )
+
+
+def minhash_signatures(shingle_sets: list, permutations: int = NEWS_MINHASH_PERMUTATIONS):
+    """
+    Calcule les signatures MinHash d'ensembles de shingles.
+
+    Args:
+        shingle_sets (list[set[str]]): Ensembles de shingles.
+        permutations (int): Nombre de fonctions de hachage (longueur des signatures).
+
+    Returns:
+        numpy.ndarray: Signatures (ensembles × permutations) ; la proportion de valeurs
+            égales entre deux signatures estime la similarité de Jaccard des ensembles.
+    """
+    import numpy as np
+
+    a, b = _permutations(permutations)
+    # Shingles de tous les ensembles hachés en une fois, puis minimum par ensemble
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingles in shingle_sets for shingle in shingles), dtype=np.uint64,
+    )
+    starts = np.cumsum([0] + [len(shingles) for shingles in shingle_sets[:-1]])
+    return np.minimum.reduceat((np.outer(hashes, a) + b) % _MERSENNE_PRIME, starts, axis=0)
+
+
+def cluster_near_duplicates(articles: list, threshold: float = NEWS_DUPLICATE_THRESHOLD, bands: int = NEWS_MINHASH_BANDS) -> list:
+    """
+    Regroupe les articles dont les titres sont quasi identiques.
+
+    Les paires candidates sont celles dont les signatures MinHash coïncident sur au moins
+    une bande (LSH). Un article rejoint le groupe d'un article candidat plus pertinent si leur
+    similarité estimée atteint `threshold`.
+
+    Args:
+        articles (list[dict]): Articles, dans l'ordre de pertinence.
+        threshold (float): Similarité de Jaccard minimale entre deux titres regroupés.
+        bands (int): Nombre de bandes LSH (diviseur du nombre de permutations).
+
+    Returns:
+        list[list[int]]: Groupes d'indices d'articles, chacun trié, dans l'ordre de leur
+            meilleur article.
+    """
+    if not articles:
+        return []
+    signatures = minhash_signatures([_shingles(article) for article in articles])
+    rows = signatures.shape[1] // bands
+
+    candidates = [set() for _ in articles]
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(row.tobytes() for row in signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            for position, i in enumerate(members):
+                candidates[i].update(members[:position])
+
+    # Chaque article rejoint le groupe du premier article plus pertinent qui lui ressemble ;
+    # la comparaison au seul représentant évite d'enchaîner des titres de plus en plus éloignés
+    leader_of, clusters = {}, {}
+    for i in range(len(articles)):
+        leader = next(
+            (j for j in sorted(candidates[i]) if leader_of[j] == j and (signatures[i] == signatures[j]).mean() >= threshold),
+            i,
+        )
+        leader_of[i] = leader
+        clusters.setdefault(leader, []).append(i)
+    return list(clusters.values())
+
+
+def build_news_digest(results: dict, max_articles: int = NEWS_DIGEST_MAX_ARTICLES, max_per_source: int = NEWS_MAX_PER_SOURCE) -> NewsDigest:
+    """
+    Construit le condensé des résultats d'une recherche de presse.
+
+    Les groupes de quasi-doublons sont retenus par ordre de pertinence, d'abord un par
+    média, puis jusqu'à `max_per_source` par média. Chaque groupe est représenté par l'article
+    du média le moins présent dans la sélection.
+
+    Args:
+        results (dict): Réponse du backend de recherche.
+        max_articles (int): Nombre maximum de groupes retenus.
+        max_per_source (int): Nombre maximum de groupes retenus par média.
+
+    Returns:
+        NewsDigest: Condensé des résultats.
+    """
+    articles = flatten_articles(results)
+    clusters = cluster_near_duplicates(articles)
+
+    selected, per_source = {}, {}
+    for limit in (1, max_per_source):
+        for position, members in enumerate(clusters):
+            if len(selected) >= max_articles:
+                break
+            if position in selected:
+                continue
+            representative = min(members, key=lambda i: per_source.get(articles[i]["source"], 0))
+            source = articles[representative]["source"]
+            if per_source.get(source, 0) < limit:
+                selected[position] = representative
+                per_source[source] = per_source.get(source, 0) + 1
+
+    items = []
+    for position in sorted(selected):
+        article = articles[selected[position]]
+        members = clusters[position]
+        others = sorted({articles[i]["source"] for i in members} - {article["source"]})
+        items.append(NewsItem(
+            title=article["title"],
+            source=article["source"],
+            link=article["link"],
+            cluster_size=len(members),
+            other_sources=others,
+        ))
+    return NewsDigest(
+        items=items,
+        articles=len(articles),
+        clusters=len(clusters),
+        sources=len({article["source"] for article in articles}),
+    )
@@ -0,0 +1,222 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from outbound import get_http_client
+from metrics import SERPAPI_CALL_SECONDS
+from config import SERP_API_KEY, SERPAPI_BASE_URL, NEWS_CACHE_TTL_SECONDS, NEWS_CACHE_NEGATIVE_TTL_SECONDS, NEWS_CACHE_MAX_ENTRIES
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalise une requête de recherche pour en faire une clé de cache.
+
+    Args:
+        query (str): Requête brute.
+
+    Returns:
+        str: Requête en minuscules, sans guillemets ni espaces superflus.
+    """
+    return " ".join(query.replace('"', " ").replace("'", " ").lower().split())
+
+
+# Type de document en tête des titres générés (« Proposition de loi visant à... ») : seul,
+# il correspond aux articles sur tous les textes du même type
+_DOCUMENT_TYPE_RE = re.compile(
+    r"^(?:proposition|projet|rapport(?:\s+l[ée]gislatif)?|texte)(?:\s+de\s+loi)?(?:\s+organique|\s+constitutionnelle)?"
+    r"\s*[:\-–]?\s*(?:(?:visant|relative?|tendant)\s+(?:à|aux?)|portant(?:\s+sur)?|sur|pour)?\s*",
+    re.IGNORECASE,
+)
+
+
+def news_search_queries(law_title: str) -> list:
+    """
+    Requêtes de presse d'un titre de loi, par ordre de préférence : le titre complet, puis
+    son sujet (titre sans le type de document), retenu si le titre ne donne aucun article.
+
+    Args:
+        law_title (str): Titre de la loi.
+
+    Returns:
+        list[str]: Requêtes distinctes (après normalisation).
+    """
+    title = law_title.replace('"', '').strip()
+    queries = []
+    for query in (title, _DOCUMENT_TYPE_RE.sub("", title)):
+        if query and normalize_query(query) not in map(normalize_query, queries):
+            queries.append(query)
+    return queries
+
+
+def is_negative_result(results: dict) -> bool:
+    """Indique si une réponse de recherche ne contient aucun article exploitable."""
+    return "error" in results or not results.get("news_results", results.get("articles"))
+
+
+class SerpApiNewsBackend:
+    """Backend de recherche Google News via l'API SerpAPI (client HTTP partagé de la couche sortante)."""
+
+    def search(self, query: str) -> dict:
+        """
+        Recherche des articles de presse.
+
+        Args:
+            query (str): Requête de recherche.
+
+        Returns:
+            dict: Réponse brute de SerpAPI.
+
+        Raises:
+            ValueError: Si la clé SerpAPI n'est pas configurée.
+            httpx.HTTPStatusError: Si SerpAPI renvoie une erreur sans corps JSON exploitable.
+        """
+        if not SERP_API_KEY:
+            raise ValueError("SerpAPI Key is missing. Please check your .env file.")
+
+        started_at = time.perf_counter()
+        status = "error"
+        try:
+            response = get_http_client("serpapi").get(
+                f"{SERPAPI_BASE_URL}/search.json",
+                params={
+                    "q": query,
+                    "engine": "google_news",
+                    "hl": "fr",
+                    "gl": "fr",
+                    "api_key": SERP_API_KEY
+                }
+            )
+            try:
+                # SerpAPI décrit ses erreurs (dont « aucun résultat ») dans un champ "error"
+                results = response.json()
+            except ValueError:
+                response.raise_for_status()
+                raise
+            if response.is_error and "error" not in results:
+                response.raise_for_status()
+            status = "empty" if is_negative_result(results) else "success"
+            return results
+        finally:
+            SERPAPI_CALL_SECONDS.observe(time.perf_counter() - started_at, status=status)
+
+
+class NewsSearchCache:
+    """
+    Cache TTL des recherches de presse, avec coalescence des requêtes simultanées.
+
+    - Les requêtes sont indexées par leur forme normalisée.
+    - Les résultats négatifs (erreur ou aucun article) sont aussi mis en cache,
+      avec une durée de vie plus courte, pour ne pas relancer la même recherche.
+    - Plusieurs appels simultanés pour la même requête partagent un seul appel
+      au backend (single-flight).
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttl_seconds: int = NEWS_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: int = NEWS_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries: int = NEWS_CACHE_MAX_ENTRIES,
+    ):
+        self.backend = backend or SerpApiNewsBackend()
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> dict:
+        """
+        Recherche des articles de presse en passant par le cache.
+
+        Args:
+            query (str): Requête de recherche.
+
+        Returns:
+            dict: Réponse du backend (éventuellement issue du cache).
+
+        Raises:
+            Exception: Toute erreur du backend (les erreurs ne sont pas mises en cache).
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+                owner = True
+
+        if not owner:
+            # Une recherche identique est déjà en cours : attendre son résultat
+            return future.result()
+
+        try:
+            results = self.backend.search(query)
+        except Exception as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        ttl = self.negative_ttl_seconds if is_negative_result(results) else self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(results)
+        return results
+
+    def search_many(self, queries: list) -> list:
+        """
+        Lance plusieurs recherches simultanément (chacune passe par le cache).
+
+        Args:
+            queries (list[str]): Requêtes de recherche.
+
+        Returns:
+            list[dict | Exception]: Réponse ou erreur de chaque requête, dans l'ordre des requêtes.
+        """
+        if len(queries) <= 1:
+            try:
+                return [self.search(query) for query in queries]
+            except Exception as e:
+                return [e]
+        with ContextThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = [executor.submit(self.search, query) for query in queries]
+        return [future.exception() or future.result() for future in futures]
+
+    def clear(self) -> None:
+        """Vide le cache (les recherches en cours ne sont pas interrompues)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Retourne les compteurs du cache.
+
+        Returns:
+            dict: Nombre de hits, de misses, de requêtes coalescées et d'entrées.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self._entries)}
+
+
+# Cache global partagé par les agents
+news_search = NewsSearchCache()
@@ -0,0 +1,386 @@
+"""
+Couche commune des appels sortants (OpenAI, SerpAPI).
+
+- Un client HTTP (httpx) par fournisseur, avec un pool de connexions keep-alive partagé.
+- Un ordonnanceur par fournisseur : token buckets requêtes/min et tokens/min, file d'attente
+  par priorité (le routeur passe avant les résumés intermédiaires).
+- Retries avec backoff exponentiel et jitter sur les erreurs 429/5xx et les erreurs réseau,
+  en respectant l'en-tête Retry-After.
+
+Les URL des fournisseurs sont configurables (OPENAI_BASE_URL, SERPAPI_BASE_URL), ce qui
+permet de tester cette couche contre un faux serveur local (voir `fakes.FakeProviderServer`).
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+import httpx
+from config import (
+    RATE_LIMITS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT_SECONDS,
+    OUTBOUND_MAX_RETRIES,
+    OUTBOUND_BACKOFF_BASE_SECONDS,
+    OUTBOUND_BACKOFF_MAX_SECONDS,
+    OPENAI_COMPLETION_TOKENS_ESTIMATE,
+)
+
+# Priorités des appels (plus petit = servi en premier)
+PRIORITY_INTERACTIVE = 0  # Routeur : bloque toute la requête utilisateur
+PRIORITY_NORMAL = 1  # Réponses finales des outils, préchargements attendus par un outil
+PRIORITY_BATCH = 2  # Résumés intermédiaires, traitements par lots
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Intervalle (s) entre deux essais d'un appel asynchrone en attente dans la file
+_ASYNC_POLL_SECONDS = 0.05
+
+_request_priority = contextvars.ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """
+    Définit la priorité des appels sortants effectués dans ce contexte
+    (propagée aux threads lancés via ContextThreadPoolExecutor).
+
+    Args:
+        priority (int): PRIORITY_INTERACTIVE, PRIORITY_NORMAL ou PRIORITY_BATCH.
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket rechargé en continu : `per_minute` unités par minute, capacité d'une minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Durée d'attente (s) avant de pouvoir consommer `amount` unités."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float, now: float) -> None:
+        """Consomme `amount` unités (le niveau peut devenir négatif après une correction)."""
+        self._refill(now)
+        self.level -= amount
+
+
+class ProviderScheduler:
+    """
+    Ordonnanceur des appels vers un fournisseur : limites requêtes/min et tokens/min,
+    file d'attente par priorité puis par ordre d'arrivée.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = None, tokens_per_minute: int = None):
+        self.name = name
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = self._paused_until - now
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        return wait
+
+    def _try_acquire(self, ticket: tuple, tokens: int):
+        """
+        Réserve une requête et `tokens` tokens si `ticket` est en tête de file et que les
+        limites le permettent (appelé sous `self._condition`).
+
+        Returns:
+            float | None: 0 si la réservation est faite, sinon l'attente estimée (s),
+                ou None si le ticket n'est pas en tête de file.
+        """
+        if self._queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        wait = self._wait_time(tokens, now)
+        if wait > 0:
+            return wait
+        if self._requests is not None:
+            self._requests.consume(1, now)
+        if self._tokens is not None and tokens:
+            self._tokens.consume(tokens, now)
+        heapq.heappop(self._queue)
+        self._condition.notify_all()
+        return 0.0
+
+    def _cancel(self, ticket: tuple) -> None:
+        """Retire de la file un ticket abandonné (appelé sous `self._condition`)."""
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._condition.notify_all()
+
+    def acquire(self, tokens: int = 0, priority: int = None) -> None:
+        """
+        Attend son tour puis réserve une requête et `tokens` tokens.
+
+        Args:
+            tokens (int): Estimation des tokens consommés par l'appel.
+            priority (int): Priorité (par défaut, celle du contexte courant).
+        """
+        priority = _request_priority.get() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._try_acquire(ticket, tokens)
+                    if wait == 0:
+                        return
+                    self._condition.wait(timeout=wait)
+            except BaseException:
+                self._cancel(ticket)
+                raise
+
+    async def aacquire(self, tokens: int = 0, priority: int = None) -> None:
+        """
+        Équivalent asynchrone de `acquire` : l'attente n'occupe aucun thread et s'interrompt
+        dès l'annulation de la tâche.
+
+        Args:
+            tokens (int): Estimation des tokens consommés par l'appel.
+            priority (int): Priorité (par défaut, celle du contexte courant).
+        """
+        priority = _request_priority.get() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    return
+                # Les threads ne peuvent pas réveiller la tâche : nouvel essai après un court délai
+                await asyncio.sleep(_ASYNC_POLL_SECONDS if wait is None else min(wait, _ASYNC_POLL_SECONDS))
+        except BaseException:
+            with self._condition:
+                self._cancel(ticket)
+            raise
+
+    def adjust_tokens(self, delta: int) -> None:
+        """Corrige la consommation de tokens une fois l'usage réel connu (delta positif ou négatif)."""
+        if self._tokens is None or not delta:
+            return
+        with self._condition:
+            self._tokens.consume(delta, time.monotonic())
+            self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Suspend tous les appels vers ce fournisseur (après un 429 par exemple)."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def queue_length(self) -> int:
+        """Nombre d'appels en attente."""
+        with self._condition:
+            return len(self._queue)
+
+
+@lru_cache(maxsize=None)
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """Retourne l'ordonnanceur partagé d'un fournisseur."""
+    limits = RATE_LIMITS.get(provider, {})
+    return ProviderScheduler(provider, limits.get("requests_per_minute"), limits.get("tokens_per_minute"))
+
+
+def estimate_openai_tokens(request: httpx.Request) -> int:
+    """
+    Estime les tokens d'un appel OpenAI à partir du corps de la requête
+    (4 caractères par token pour le prompt, plus la réponse attendue).
+
+    Args:
+        request (httpx.Request): Requête sortante.
+
+    Returns:
+        int: Nombre de tokens estimé.
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return OPENAI_COMPLETION_TOKENS_ESTIMATE
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in body.get("messages", []))
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or OPENAI_COMPLETION_TOKENS_ESTIMATE
+    return prompt_chars // 4 + completion
+
+
+def _is_json_response(response: httpx.Response) -> bool:
+    """Indique si la réponse est un JSON complet (et non un flux SSE à ne pas consommer ici)."""
+    return "application/json" in response.headers.get("content-type", "")
+
+
+def _usage_tokens(response: httpx.Response):
+    """Tokens réellement consommés, lus dans une réponse JSON déjà chargée (None si indisponible)."""
+    try:
+        return (response.json().get("usage") or {}).get("total_tokens")
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, response: httpx.Response = None) -> float:
+    """
+    Délai avant le prochain essai : Retry-After si fourni, sinon backoff exponentiel avec jitter.
+
+    Args:
+        attempt (int): Numéro de l'essai échoué (0 pour le premier).
+        response (httpx.Response): Réponse en erreur, le cas échéant.
+
+    Returns:
+        float: Délai en secondes.
+    """
+    if response is not None:
+        try:
+            return min(float(response.headers["retry-after"]), OUTBOUND_BACKOFF_MAX_SECONDS)
+        except (KeyError, ValueError):
+            pass
+    ceiling = min(OUTBOUND_BACKOFF_MAX_SECONDS, OUTBOUND_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """Transport httpx synchrone qui passe par l'ordonnanceur du fournisseur et réessaie les échecs transitoires."""
+
+    def __init__(self, provider: str, estimate_tokens=None, max_retries: int = OUTBOUND_MAX_RETRIES):
+        self.scheduler = get_scheduler(provider)
+        self.estimate_tokens = estimate_tokens
+        self.max_retries = max_retries
+        self._transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS)
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        tokens = self.estimate_tokens(request) if self.estimate_tokens else 0
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire(tokens)
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = backoff_delay(attempt, response)
+                response.close()
+                if response.status_code == 429:
+                    self.scheduler.pause(delay)
+                time.sleep(delay)
+                continue
+            if tokens and _is_json_response(response):
+                response.read()
+                used = _usage_tokens(response)
+                if used is not None:
+                    self.scheduler.adjust_tokens(used - tokens)
+            return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncScheduledTransport(httpx.AsyncBaseTransport):
+    """Équivalent asynchrone de `ScheduledTransport` (l'attente de l'ordonnanceur ne bloque pas la boucle)."""
+
+    def __init__(self, provider: str, estimate_tokens=None, max_retries: int = OUTBOUND_MAX_RETRIES):
+        self.scheduler = get_scheduler(provider)
+        self.estimate_tokens = estimate_tokens
+        self.max_retries = max_retries
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS)
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        tokens = self.estimate_tokens(request) if self.estimate_tokens else 0
+        priority = _request_priority.get()
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.aacquire(tokens, priority)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = backoff_delay(attempt, response)
+                await response.aclose()
+                if response.status_code == 429:
+                    self.scheduler.pause(delay)
+                await asyncio.sleep(delay)
+                continue
+            if tokens and _is_json_response(response):
+                await response.aread()
+                used = _usage_tokens(response)
+                if used is not None:
+                    self.scheduler.adjust_tokens(used - tokens)
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_TOKEN_ESTIMATORS = {"openai": estimate_openai_tokens}
+
+
+@lru_cache(maxsize=None)
+def get_http_client(provider: str) -> httpx.Client:
+    """
+    Retourne le client HTTP synchrone partagé d'un fournisseur (pool keep-alive + ordonnanceur).
+
+    Args:
+        provider (str): "openai" ou "serpapi".
+
+    Returns:
+        httpx.Client: Client partagé.
+    """
+    return httpx.Client(
+        transport=ScheduledTransport(provider, _TOKEN_ESTIMATORS.get(provider)),
+        timeout=HTTP_TIMEOUT_SECONDS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """
+    Retourne le client HTTP asynchrone partagé d'un fournisseur.
+
+    Args:
+        provider (str): "openai" ou "serpapi".
+
+    Returns:
+        httpx.AsyncClient: Client partagé.
+    """
+    return httpx.AsyncClient(
+        transport=AsyncScheduledTransport(provider, _TOKEN_ESTIMATORS.get(provider)),
+        timeout=HTTP_TIMEOUT_SECONDS,
+    )
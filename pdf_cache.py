@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES
+
+# Version du format des entrées de cache (à incrémenter si le format change)
+CACHE_FORMAT_VERSION = 2
+
+
+@dataclass
+class PdfExtraction:
+    """Résultat de l'extraction d'un PDF : texte par page, métadonnées et index de recherche sérialisé."""
+    sha256: str
+    pages: list = field(default_factory=list)
+    metadata: dict = field(default_factory=dict)
+    index: dict = None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pages)
+
+
+def hash_pdf_bytes(data: bytes) -> str:
+    """
+    Calcule l'empreinte SHA-256 du contenu binaire d'un PDF.
+
+    Args:
+        data (bytes): Contenu brut du fichier PDF.
+
+    Returns:
+        str: Empreinte hexadécimale.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class PdfExtractionCache:
+    """
+    Cache disque des extractions PDF, adressé par le SHA-256 du fichier.
+
+    Chaque entrée est un fichier JSON compressé (gzip) contenant le texte de
+    chaque page et les métadonnées. La taille totale est bornée : les entrées
+    les moins récemment utilisées (date de modification) sont supprimées.
+    """
+
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.json.gz")
+
+    def contains(self, sha256: str) -> bool:
+        """Indique si une extraction est en cache pour ce PDF (sans la lire)."""
+        return os.path.exists(self._path(sha256))
+
+    def get(self, sha256: str):
+        """
+        Récupère une extraction depuis le cache.
+
+        Args:
+            sha256 (str): Empreinte du PDF.
+
+        Returns:
+            PdfExtraction | None: L'extraction si présente, None sinon.
+        """
+        path = self._path(sha256)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        # Marquer l'entrée comme récemment utilisée (politique LRU)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return PdfExtraction(sha256=sha256, pages=entry["pages"], metadata=entry.get("metadata", {}), index=entry.get("index"))
+
+    def put(self, extraction: PdfExtraction) -> None:
+        """
+        Enregistre une extraction dans le cache puis applique l'éviction LRU.
+
+        Args:
+            extraction (PdfExtraction): Extraction à enregistrer.
+        """
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "pages": extraction.pages,
+            "metadata": {**extraction.metadata, "page_count": extraction.page_count},
+            "index": extraction.index,
+        }
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(extraction.sha256)
+            # Écriture atomique pour ne jamais exposer une entrée partielle
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Supprime les entrées les plus anciennes tant que la taille maximale est dépassée."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# Cache global partagé par le pipeline
+pdf_cache = PdfExtractionCache()
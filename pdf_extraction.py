@@ -0,0 +1,106 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from PyPDF2 import PdfReader
+
+
+def _open_reader(data: bytes) -> PdfReader:
+    """Ouvre un lecteur PyPDF2 sur le contenu binaire d'un PDF."""
+    return PdfReader(io.BytesIO(data))
+
+
+def count_pages(data: bytes) -> int:
+    """
+    Compte les pages d'un PDF sans extraire leur texte.
+
+    Args:
+        data (bytes): Contenu brut du fichier PDF.
+
+    Returns:
+        int: Nombre de pages.
+    """
+    return len(_open_reader(data).pages)
+
+
+def iter_pages(data: bytes, start: int = 0, stop: int = None):
+    """
+    Générateur qui produit le texte des pages au fur et à mesure de l'analyse.
+
+    Args:
+        data (bytes): Contenu brut du fichier PDF.
+        start (int): Indice de la première page (inclus).
+        stop (int): Indice de la dernière page (exclu), None pour aller jusqu'à la fin.
+
+    Yields:
+        tuple[int, str]: Indice de la page et texte extrait.
+    """
+    reader = _open_reader(data)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for index in range(start, stop):
+        yield index, reader.pages[index].extract_text() or ""
+
+
+def _extract_page_range(args) -> list:
+    """Extrait une plage de pages (exécuté dans un processus worker)."""
+    data, start, stop = args
+    return [text for _, text in iter_pages(data, start, stop)]
+
+
+@lru_cache(maxsize=None)
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé par toutes les extractions (un par taille, créé au premier appel).
+    Les processus sont démarrés par « spawn » : un fork depuis un processus multi-thread
+    (Streamlit, jobs, traitement par lots) peut hériter d'un verrou (logging) tenu par un autre thread.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def extract_pages(data: bytes, workers: int = 1, min_pages_per_worker: int = 8) -> list:
+    """
+    Extrait le texte de toutes les pages, en série ou via le pool de processus partagé.
+    Les plages de pages sont réparties entre les workers puis réassemblées dans l'ordre.
+
+    Args:
+        data (bytes): Contenu brut du fichier PDF.
+        workers (int): Nombre de processus (1 = extraction en série, 0 ou None = nombre de cœurs).
+        min_pages_per_worker (int): Nombre minimal de pages par plage pour justifier un processus.
+
+    Returns:
+        list[str]: Texte de chaque page.
+    """
+    pool_size = workers or os.cpu_count() or 1
+    page_count = count_pages(data)
+    workers = min(pool_size, page_count // max(min_pages_per_worker, 1))
+    if workers <= 1:
+        return [text for _, text in iter_pages(data)]
+
+    # Découper le document en plages contiguës de tailles équilibrées
+    bounds = [page_count * i // workers for i in range(workers + 1)]
+    ranges = [(data, bounds[i], bounds[i + 1]) for i in range(workers)]
+    chunks = _process_pool(pool_size).map(_extract_page_range, ranges)
+    return [text for chunk in chunks for text in chunk]
+
+
+def read_prefix(data: bytes, max_chars: int) -> str:
+    """
+    Lit uniquement le début du document : l'analyse s'arrête dès que
+    `max_chars` caractères ont été extraits.
+
+    Args:
+        data (bytes): Contenu brut du fichier PDF.
+        max_chars (int): Nombre de caractères souhaités.
+
+    Returns:
+        str: Les `max_chars` premiers caractères du texte.
+    """
+    parts = []
+    length = 0
+    for _, text in iter_pages(data):
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return "".join(parts)[:max_chars]
@@ -1,82 +1,284 @@
-from langchain.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, ToolMessage, BaseMessage, HumanMessage
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from langchain_core.tools import tool
+from langchain_core.messages import SystemMessage, ToolMessage, BaseMessage, HumanMessage, AIMessage, RemoveMessage
+from langchain_core.tools import InjectedToolArg
+from functools import lru_cache
 from typing import Annotated, Sequence, TypedDict
-from langfuse import observe
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
+from langgraph.config import get_stream_writer
 from langchain_core.runnables import RunnableConfig
-from summarizer_agent import summarize_law_text
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from summarizer_agent import summarize_law_text, summarize_passages
 from tone_analysis_agent import analyze_tone_of_voice, create_law_title
-from config import langfuse_handler, MAX_CHARS
-from PyPDF2 import PdfReader
+from document_registry import document_registry
+from pdf_cache import PdfExtraction, hash_pdf_bytes, pdf_cache
+from pdf_extraction import extract_pages, read_prefix
+from retrieval import BM25Index, document_indexes
+from compaction import compact_document, normalize_text
+from boilerplate import remove_boilerplate
+from tokenizer import count_tokens
+from llm_client import get_llm
+from outbound import request_priority, PRIORITY_INTERACTIVE
+from press_prefetch import press_prefetcher
+from metrics import timed, log_event, TOOL_SECONDS, PDF_CACHE_LOOKUPS
+from tracing import observe, callbacks_config, trace_root
+from config import (
+    TITLE_CONTEXT_TOKENS,
+    PDF_EXTRACTION_WORKERS,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+    SPECULATIVE_PREFETCH,
+    SESSION_DB_PATH,
+    SESSION_MAX_TURNS,
+    SESSION_HISTORY_TOKENS,
+    SESSION_MAX_TOOL_RESULTS,
+)
+
+# Fusionner les résultats d'outils d'une session (les plus récents sont conservés)
+def _merge_tool_results(previous: dict, new: dict) -> dict:
+    merged = {**(previous or {}), **(new or {})}
+    return dict(list(merged.items())[-SESSION_MAX_TOOL_RESULTS:])
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Résultats des outils déjà exécutés dans la session, par appel (outil + arguments)
+    tool_results: Annotated[dict, _merge_tool_results]
 
-# Initialiser le modèle
-model = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.1
-)
+# Les tools ne reçoivent du LLM qu'un identifiant de document (doc_id).
+# Le texte complet (law_text) est injecté côté serveur par `tool_node` et
+# n'apparaît pas dans le schéma exposé au modèle.
 
 # Tool : Résumé des textes de loi
 @tool
 @observe(name="summarize_tool")
-def summarize_tool(law_text: str):
-    """Produit un résumé clair et compréhensible d'un texte de loi."""
-    return summarize_law_text(law_text)
+def summarize_tool(doc_id: str, focus: str = "", law_text: Annotated[str, InjectedToolArg] = ""):
+    """Produit un résumé clair et compréhensible d'un texte de loi identifié par doc_id.
+    Si la demande vise une partie ou une question précise (article, exposé des motifs, thème),
+    la décrire dans focus (ex. "article 4") : le résumé porte alors sur les passages pertinents."""
+    if focus.strip():
+        # Demande ciblée : seuls les passages les plus pertinents de tout le document sont envoyés
+        return summarize_passages(document_indexes.get_or_build(law_text).search(focus), focus)
+    # Les formules types déjà vues dans d'autres documents sont retirées ou résumées une fois pour toutes
+    return summarize_law_text(remove_boilerplate(law_text).text)
 
 # Tool : Analyse du tone of voice
 @tool
 @observe(name="tone_analysis_tool")
-def tone_analysis_tool(law_text: str):
-    """Analyse le tone of voice des médias à propos d'un texte de loi."""
-    law_title = create_law_title(law_text)
+def tone_analysis_tool(doc_id: str, law_text: Annotated[str, InjectedToolArg] = ""):
+    """Analyse le tone of voice des médias à propos d'un texte de loi identifié par doc_id."""
+    # Réutiliser le titre préchargé en mode spéculatif, sinon le générer
+    # (l'intitulé et le début des sections suffisent pour générer un titre de recherche)
+    law_title = press_prefetcher.take_title(doc_id) or create_law_title(compact_document(law_text, TITLE_CONTEXT_TOKENS))
     return analyze_tone_of_voice(law_title)
 
 
 tools=[summarize_tool, tone_analysis_tool]
+
+
+def is_error_result(result) -> bool:
+    """
+    Indique si le résultat d'un outil est un échec : les agents renvoient leurs erreurs
+    sous forme de message (« Erreur lors de... ») affiché tel quel à l'utilisateur.
+
+    Args:
+        result: Résultat de l'outil ou de l'agent.
+
+    Returns:
+        bool: True si le résultat est un message d'erreur.
+    """
+    return isinstance(result, str) and result.startswith("Erreur")
+
 tools_by_name = {tool.name: tool for tool in tools}
-llm_model_with_tools = model.bind_tools(tools)
+
+# Modèle routeur : (client partagé, client lié aux outils), construit au premier appel
+_router_model = None
+
+def get_router_model():
+    """Retourne le client LLM partagé, lié aux outils du routeur (reconstruit si le client change)."""
+    global _router_model
+    llm = get_llm()
+    if _router_model is None or _router_model[0] is not llm:
+        _router_model = (llm, llm.bind_tools(tools))
+    return _router_model[1]
+
+# Exécuter un appel d'outil (résolution du doc_id incluse)
+def _run_tool_call(tool_call) -> str:
+    """
+    Exécute un appel d'outil après avoir résolu le doc_id vers le texte complet.
+    
+    Args:
+        tool_call: Appel d'outil émis par le LLM (name, args, id)
+    
+    Returns:
+        str: Résultat de l'outil
+    """
+    if tool_call["name"] not in tools_by_name:
+        return f"Erreur : outil inconnu '{tool_call['name']}'."
+    doc_id = tool_call["args"].get("doc_id", "")
+    try:
+        # Résolution côté serveur de l'identifiant vers le texte complet
+        law_text = document_registry.get(doc_id)
+    except KeyError:
+        return f"Erreur : document inconnu '{doc_id}'."
+    started_at = time.perf_counter()
+    status = "error"
+    try:
+        # La métadonnée tool_name permet d'attribuer les tokens diffusés en streaming à leur outil
+        tool_result = tools_by_name[tool_call["name"]].invoke(
+            {**tool_call["args"], "law_text": law_text},
+            config={"metadata": {"tool_name": tool_call["name"]}}
+        )
+        # Les outils signalent aussi leurs échecs par un message d'erreur
+        status = "error" if is_error_result(tool_result) else "success"
+        return tool_result
+    finally:
+        TOOL_SECONDS.observe(time.perf_counter() - started_at, tool=tool_call["name"], status=status)
+
+# Un seul événement `tool_end` par appel : celui de l'outil ou celui du délai dépassé
+_tool_end_lock = threading.Lock()
+
+# Exécuter un appel d'outil en signalant sa fin au flux de streaming
+def _run_tool_call_streamed(tool_call, writer, abandoned: threading.Event) -> str:
+    """
+    Exécute un appel d'outil et émet l'événement `tool_end` dès qu'il se termine,
+    sauf si l'appel a été abandonné entre-temps (délai dépassé, résultat ignoré).
+    """
+    try:
+        tool_result = _run_tool_call(tool_call)
+    except Exception as e:
+        with _tool_end_lock:
+            if not abandoned.is_set():
+                writer({"type": "tool_end", "tool": tool_call["name"], "status": "error", "content": str(e)})
+        raise
+    with _tool_end_lock:
+        if not abandoned.is_set():
+            writer({"type": "tool_end", "tool": tool_call["name"], "status": "success", "content": tool_result})
+    return tool_result
+
+# Clé d'un appel d'outil (outil + arguments) pour réutiliser son résultat dans une session
+def _tool_result_key(tool_call) -> str:
+    return f"{tool_call['name']}:{json.dumps(tool_call['args'], sort_keys=True, ensure_ascii=False)}"
 
 # Define our tool node
+@timed("tool_node")
 def tool_node(state: AgentState) -> AgentState:
     """
     Exécute les outils sélectionnés par l'agent.
+    Les appels indépendants sont exécutés en parallèle, chacun avec son propre délai
+    maximal : un outil en échec ou trop lent produit un message d'erreur sans bloquer
+    les résultats des autres. Un appel identique à un appel précédent de la session
+    (même outil, mêmes arguments) réutilise son résultat sans être réexécuté.
     
     Args:
         state: État actuel du graphe contenant les messages
     
     Returns:
-        Dict avec les messages de résultat des outils
+        Dict avec les messages de résultat des outils et les nouveaux résultats réutilisables
     """
+    tool_calls = state["messages"][-1].tool_calls
+    previous_results = state.get("tool_results") or {}
+    # Événements de progression (sans effet hors streaming)
+    writer = get_stream_writer()
+    # ContextThreadPoolExecutor propage le contexte (callbacks, traces) aux threads
+    executor = ContextThreadPoolExecutor(max_workers=max(len(tool_calls), 1))
+    started_at = time.monotonic()
+    futures = []
+    for tool_call in tool_calls:
+        writer({"type": "tool_start", "tool": tool_call["name"]})
+        key = _tool_result_key(tool_call)
+        if key in previous_results:
+            writer({"type": "tool_end", "tool": tool_call["name"], "status": "success", "content": previous_results[key], "reused": True})
+            futures.append(None)
+        else:
+            # Marqué si l'appel dépasse son délai : le thread de l'outil n'émet plus d'événement
+            abandoned = threading.Event()
+            futures.append((executor.submit(_run_tool_call_streamed, tool_call, writer, abandoned), abandoned))
+    
     outputs = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
+    new_results = {}
+    for tool_call, submitted in zip(tool_calls, futures):
+        if submitted is None:
+            outputs.append(ToolMessage(content=previous_results[_tool_result_key(tool_call)], name=tool_call["name"], tool_call_id=tool_call["id"]))
+            continue
+        timeout = TOOL_TIMEOUTS.get(tool_call["name"], TOOL_TIMEOUT_SECONDS)
+        remaining = max(started_at + timeout - time.monotonic(), 0)
+        future, abandoned = submitted
+        status = "success"
+        try:
+            tool_result = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            future.cancel()
+            tool_result = f"Erreur : l'outil {tool_call['name']} a dépassé le délai maximal ({timeout} s)."
+            status = "error"
+            with _tool_end_lock:
+                abandoned.set()
+                writer({"type": "tool_end", "tool": tool_call["name"], "status": status, "content": tool_result})
+        except Exception as e:
+            tool_result = f"Erreur lors de l'exécution de l'outil {tool_call['name']} : {str(e)}"
+            status = "error"
+        if status == "success":
+            new_results[_tool_result_key(tool_call)] = tool_result
         outputs.append(
             ToolMessage(
                 content=tool_result,
                 name=tool_call["name"],
-                tool_call_id=tool_call["id"]
+                tool_call_id=tool_call["id"],
+                status=status
             )
         )
-    return {"messages": outputs}
+    # Ne pas attendre les outils ayant dépassé leur délai
+    executor.shutdown(wait=False, cancel_futures=True)
+    return {"messages": outputs, "tool_results": new_results}
+
+# Borner l'historique d'une session
+def _trim_history(messages: list) -> int:
+    """
+    Calcule le début de l'historique conservé : au plus `SESSION_MAX_TURNS` échanges
+    et `SESSION_HISTORY_TOKENS` tokens, l'échange en cours étant toujours conservé.
+    
+    Args:
+        messages (list): Messages de la session.
+    
+    Returns:
+        int: Index du premier message conservé.
+    """
+    turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if not turn_starts:
+        return 0
+    turn_starts = turn_starts[-SESSION_MAX_TURNS:]
+    tokens = [count_tokens(str(message.content)) for message in messages]
+    for start in turn_starts[:-1]:
+        if sum(tokens[start:]) <= SESSION_HISTORY_TOKENS:
+            return start
+    return turn_starts[-1]
 
 # Define the node that calls the llm model
+@timed("call_llm_node")
 def call_llm_node(state: AgentState, config: RunnableConfig) -> AgentState:
     """
     Appelle le modèle LLM avec les outils disponibles.
+    En session, les échanges les plus anciens sont retirés de l'état avant l'appel.
     
     Args:
         state: État actuel du graphe
         config: Configuration incluant les callbacks Langfuse
     
     Returns:
-        Dict avec la réponse du modèle
+        Dict avec la réponse du modèle (et les messages retirés de l'historique)
     """
-    response = llm_model_with_tools.invoke(state["messages"], config)
-    return {"messages": [response]}
+    messages = list(state["messages"])
+    start = _trim_history(messages)
+    # Le routeur conditionne toute la requête : il passe en tête de file
+    with request_priority(PRIORITY_INTERACTIVE):
+        response = get_router_model().invoke([SYSTEM_PROMPT_SIMPLE_AGENT, *messages[start:]], config)
+    return {"messages": [*(RemoveMessage(id=message.id) for message in messages[:start]), response]}
 
 # Define the condition edge that determines whether to continue or not
 def should_continue(state: AgentState) -> str:
@@ -118,58 +320,249 @@ workflow.add_conditional_edges(
 workflow.add_edge("tool", END)
 graph = workflow.compile()
 
-# Générer l'image PNG du graphe au démarrage
-def generate_graph_png():
-    """Génère une image PNG du graphe LangGraph."""
+# Graphe des sessions : l'état de chaque conversation est conservé par un checkpointer
+@lru_cache(maxsize=None)
+def get_session_graph():
+    """
+    Compile le graphe avec un checkpointer SQLite local (`SESSION_DB_PATH`, en mémoire si vide),
+    au premier appel. Chaque conversation est un thread (session + document).
+    
+    Returns:
+        CompiledStateGraph: Graphe avec persistance des sessions.
+    """
+    if not SESSION_DB_PATH:
+        from langgraph.checkpoint.memory import InMemorySaver
+        return workflow.compile(checkpointer=InMemorySaver())
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    
+    directory = os.path.dirname(SESSION_DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(SESSION_DB_PATH, check_same_thread=False)
+    return workflow.compile(checkpointer=SqliteSaver(connection))
+
+# Graphe des sessions pour l'exécution asynchrone (checkpointer aiosqlite)
+_async_session_graph = None
+
+async def aget_session_graph():
+    """
+    Variante asynchrone de `get_session_graph` (même base SQLite), construite au premier appel.
+    Le checkpointer est lié à la boucle d'événements qui l'a créé : à utiliser depuis une
+    seule boucle (celle du gestionnaire de jobs).
+    
+    Returns:
+        CompiledStateGraph: Graphe avec persistance asynchrone des sessions.
+    """
+    global _async_session_graph
+    if _async_session_graph is None:
+        if not SESSION_DB_PATH:
+            # Le checkpointer en mémoire supporte les deux modes d'exécution
+            _async_session_graph = get_session_graph()
+        else:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            
+            get_session_graph()  # Création du dossier de la base
+            connection = await aiosqlite.connect(SESSION_DB_PATH)
+            if _async_session_graph is None:
+                _async_session_graph = workflow.compile(checkpointer=AsyncSqliteSaver(connection))
+            else:
+                await connection.close()
+    return _async_session_graph
+
+# Config LangGraph d'une conversation
+def _session_config(session_id: str, doc_id: str) -> dict:
+    """Identifie le thread d'une conversation : session de l'utilisateur et empreinte du document."""
+    return {"configurable": {"thread_id": f"{session_id}:{doc_id}"}}
+
+# Générer l'image PNG du graphe à la demande
+def generate_graph_png(path: str = "agent_graph.png", force: bool = False):
+    """
+    Génère une image PNG du graphe LangGraph (rendu distant via mermaid.ink).
+    Le rendu n'est refait que si la structure du graphe a changé : le hash de la
+    source Mermaid est conservé à côté de l'image.
+    
+    Args:
+        path (str): Chemin de l'image à générer.
+        force (bool): Regénérer l'image même si le graphe n'a pas changé.
+    
+    Returns:
+        bool: True si l'image est à jour, False en cas d'échec du rendu.
+    """
+    mermaid_source = graph.get_graph().draw_mermaid()
+    graph_hash = hashlib.sha256(mermaid_source.encode("utf-8")).hexdigest()
+    hash_path = f"{path}.sha256"
+    
+    if not force and os.path.exists(path) and os.path.exists(hash_path):
+        with open(hash_path, encoding="utf-8") as f:
+            if f.read().strip() == graph_hash:
+                return True
+    
     try:
         graph_image = graph.get_graph().draw_mermaid_png()
-        with open("agent_graph.png", "wb") as f:
+        with open(path, "wb") as f:
             f.write(graph_image)
-        print("✓ Graphe généré : agent_graph.png")
+        with open(hash_path, "w", encoding="utf-8") as f:
+            f.write(graph_hash)
+        print(f"✓ Graphe généré : {path}")
         return True
     except Exception as e:
         print(f"⚠️ Impossible de générer le graphe PNG : {e}")
         return False
 
-# Générer le graphe au chargement du module
-generate_graph_png()
-
 SYSTEM_PROMPT_SIMPLE_AGENT = SystemMessage(
     content="""Assistant juridique. 2 outils disponibles :
-- summarize_tool(law_text) : résume la loi
-- tone_analysis_tool(law_text) : analyse presse
+- summarize_tool(doc_id, focus) : résume la loi (focus : partie ou question précise visée, vide sinon)
+- tone_analysis_tool(doc_id) : analyse presse
 
-RÈGLE STRICTE : Tu dois choisir UN SEUL outil à la fois.
-- Si résumé demandé : utilise UNIQUEMENT summarize_tool
-- Si analyse presse demandée : utilise UNIQUEMENT tone_analysis_tool
-- Si "les deux" demandé : choisis celui qui te semble le plus pertinent
+Le document est désigné par son identifiant (doc_id). Passe uniquement cet
+identifiant aux outils, ne recopie jamais le texte de la loi.
 
-Tu ne peux PAS appeler les deux outils simultanément."""
+Choisis les outils selon la demande :
+- Si résumé demandé : utilise summarize_tool
+- Si la demande porte sur une partie précise (ex. "que prévoit l'article 4 ?") : utilise summarize_tool avec focus="article 4"
+- Si analyse presse demandée : utilise tone_analysis_tool
+- Si "les deux" demandé : appelle les deux outils dans la même réponse (ils sont exécutés en parallèle)
+- Si la réponse à une question de suivi figure déjà dans les résultats d'outils précédents
+  de la conversation : réponds directement, en français, sans appeler d'outil
+
+N'appelle jamais deux fois le même outil dans une même réponse."""
 )
 
+# Fonction pour lire le contenu binaire d'un PDF
+def _read_pdf_bytes(file_source) -> bytes:
+    """Retourne le contenu binaire d'un chemin ou d'un objet fichier."""
+    if isinstance(file_source, bytes):
+        return file_source
+    if isinstance(file_source, (str, os.PathLike)):
+        with open(file_source, "rb") as f:
+            return f.read()
+    if hasattr(file_source, "getvalue"):
+        return file_source.getvalue()
+    file_source.seek(0)
+    return file_source.read()
+
+# Fonction pour extraire un PDF (avec cache disque)
+@timed("extract_pdf")
+def extract_pdf(file_source) -> PdfExtraction:
+    """
+    Extrait le texte de chaque page d'un PDF et indexe ses passages, en passant par le cache disque.
+    Un PDF déjà vu (même SHA-256) n'est ni ré-analysé ni ré-indexé.
+    
+    Args:
+        file_source: Chemin vers le fichier PDF (str), contenu binaire (bytes) ou objet fichier (UploadedFile, file-like object).
+    
+    Returns:
+        PdfExtraction: Texte par page, métadonnées (nombre de pages, etc.) et index de recherche.
+    """
+    data = _read_pdf_bytes(file_source)
+    sha256 = hash_pdf_bytes(data)
+    
+    extraction = pdf_cache.get(sha256)
+    PDF_CACHE_LOOKUPS.inc(result="miss" if extraction is None else "hit")
+    if extraction is not None and extraction.index is not None:
+        # Index de recherche stocké avec l'extraction : pas de ré-indexation
+        document_indexes.put(normalize_text(extraction.text), BM25Index.from_dict(extraction.index))
+        return extraction
+    
+    if extraction is None:
+        extraction = PdfExtraction(
+            sha256=sha256,
+            pages=extract_pages(data, workers=PDF_EXTRACTION_WORKERS),
+            metadata={"size_bytes": len(data)},
+        )
+    # Indexation des passages du texte normalisé (celui que reçoivent les outils),
+    # une fois par document (entrées antérieures à l'index comprises)
+    law_text = normalize_text(extraction.text)
+    index = BM25Index.build(law_text)
+    document_indexes.put(law_text, index)
+    extraction.index = index.to_dict()
+    pdf_cache.put(extraction)
+    return extraction
+
 # Fonction pour lire un fichier PDF
-def read_pdf(file_source) -> str:
+@timed("read_pdf")
+def read_pdf(file_source, max_chars: int = None) -> str:
     """
     Lit un fichier PDF et extrait son contenu textuel.
     
     Args:
         file_source: Chemin vers le fichier PDF (str) ou objet fichier (UploadedFile, file-like object).
+        max_chars (int): Si précisé, seuls les premiers caractères sont nécessaires :
+            l'analyse s'arrête dès qu'ils sont extraits (hors cache).
     
     Returns:
         str: Texte extrait du PDF.
     """
     try:
-        reader = PdfReader(file_source)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        if max_chars is None:
+            return extract_pdf(file_source).text
+        data = _read_pdf_bytes(file_source)
+        extraction = pdf_cache.get(hash_pdf_bytes(data))
+        if extraction is not None:
+            return extraction.text[:max_chars]
+        return read_prefix(data, max_chars)
     except Exception as e:
         return f"Erreur lors de la lecture du PDF : {str(e)}"
 
+# Préparer l'état initial du graphe pour un texte de loi
+def _build_initial_state(law_text: str, user_request: str, max_tokens: int = None, session_id: str = None):
+    """
+    Enregistre le document et construit l'état initial du graphe (ou le nouveau message
+    d'une conversation en cours).
+    
+    Args:
+        law_text (str): Le texte de la loi à analyser.
+        user_request (str): La demande de l'utilisateur.
+        max_tokens (int): Budget de tokens du texte traité (None : document complet).
+        session_id (str): Identifiant de la session de l'utilisateur (None : requête isolée).
+    
+    Returns:
+        tuple: (doc_id, texte enregistré, état initial du graphe)
+    """
+    # Nettoyer le texte extrait et, si demandé, le compacter dans le budget
+    # (le résumé map-reduce couvre sinon tout le document)
+    law_text_prepared = compact_document(law_text, max_tokens) if max_tokens else normalize_text(law_text)
+    
+    # Enregistrer le texte : le routeur ne voit qu'un identifiant et un aperçu
+    doc_id = document_registry.register(law_text_prepared)
+    
+    # Question de suivi : le routeur a déjà vu l'aperçu du document dans la conversation
+    follow_up = bool(session_id) and bool(get_session_graph().get_state(_session_config(session_id, doc_id)).values.get("messages"))
+    
+    log_event("agent_request", doc_id=doc_id, chars=len(law_text_prepared), session=bool(session_id), follow_up=follow_up)
+    
+    # Construire la requête avec l'identifiant du document et un aperçu compact
+    full_query = f"{user_request}\n\nDocument (doc_id) : {doc_id}"
+    if not follow_up:
+        full_query += f"\nAperçu : {document_registry.preview(doc_id)}"
+    
+    # Le prompt système est ajouté par `call_llm_node` (il n'est pas conservé dans les sessions)
+    initial_state = {"messages": [HumanMessage(content=full_query)]}
+    return doc_id, law_text_prepared, initial_state
+
+# Mettre en forme les résultats des outils
+def _format_tool_results(messages) -> str:
+    """
+    Construit la réponse Markdown à partir des ToolMessage du dernier échange, ou de la
+    réponse directe du routeur (question de suivi traitée sans outil).
+    """
+    # En session, l'état contient aussi les échanges précédents
+    last_request = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=-1)
+    messages = messages[last_request + 1:]
+    tool_results = []
+    for message in messages:
+        if type(message).__name__ == "ToolMessage":
+            tool_results.append(f"## {message.name}\n\n{message.content}\n\n---\n")
+    if tool_results:
+        return "\n".join(tool_results)
+    answer = next((message.content for message in reversed(messages) if isinstance(message, AIMessage) and message.content), None)
+    return answer or "Aucune réponse générée."
+
 # Fonction pour exécuter l'agent avec un texte de loi
 @observe(name="run_agent_with_law_text")
-def run_agent_with_law_text(law_text: str, user_request: str, max_chars: int = MAX_CHARS):
+def run_agent_with_law_text(law_text: str, user_request: str, max_tokens: int = None, speculative: bool = SPECULATIVE_PREFETCH, session_id: str = None):
     """
     Exécute l'agent LangGraph avec un texte de loi.
     L'agent décide automatiquement quels outils utiliser.
@@ -177,34 +570,152 @@ def run_agent_with_law_text(law_text: str, user_request: str, max_chars: int = M
     Args:
         law_text (str): Le texte de la loi à analyser.
         user_request (str): La demande de l'utilisateur (résumé, analyse, etc.)
-        max_chars (int): Nombre maximum de caractères à traiter (défaut: 5000)
+        max_tokens (int): Budget de tokens du texte traité, compacté par sections
+            (défaut : document complet, les longs documents étant résumés en map-reduce)
+        speculative (bool): Si True, le titre de la loi et la recherche de presse sont
+            préchargés pendant le routage (gain d'un aller-retour LLM sur les demandes presse).
+        session_id (str): Identifiant de la session de l'utilisateur. Si précisé, la requête
+            poursuit la conversation sur ce document : historique (borné) et résultats
+            d'outils précédents sont conservés et réutilisés.
     
     Returns:
         str: Réponse finale de l'agent formatée en Markdown.
     """
+    doc_id, law_text_prepared, initial_state = _build_initial_state(law_text, user_request, max_tokens, session_id)
+    run_graph, run_config = (get_session_graph(), _session_config(session_id, doc_id)) if session_id else (graph, {})
     
-    # Limiter le texte pour éviter dépassement contexte et timeouts
-    law_text_truncated = law_text[:max_chars]
+    # Précharger le chemin presse en parallèle du routage
+    if speculative:
+        press_prefetcher.start(doc_id, law_text_prepared)
     
-    print(f"\n🤖 L'agent analyse votre demande ({len(law_text_truncated)} caractères)...\n")
+    # Exécuter le graph avec Langfuse tracing
+    try:
+        result = run_graph.invoke(
+            initial_state,
+            config=callbacks_config(**run_config)
+        )
+    finally:
+        # Préchargement non consommé (routeur sans analyse presse) : l'annuler
+        if speculative:
+            press_prefetcher.discard(doc_id)
     
-    # Construire la requête complète avec le texte de loi
-    full_query = f"{user_request}\n\nTexte de la loi :\n{law_text_truncated}"
+    # Extraire les résultats des tools uniquement
+    return _format_tool_results(result["messages"])
+
+# Modes de streaming du graphe : mises à jour des nœuds, tokens des LLM, événements des outils
+STREAM_MODES = ["updates", "messages", "custom"]
+
+# Traduire un élément du flux LangGraph en événements de progression
+def _stream_events(mode: str, chunk, messages: list):
+    """
+    Traduit un élément de `graph.stream` en événements de progression.
     
-    initial_state = {
-        "messages": [SYSTEM_PROMPT_SIMPLE_AGENT, HumanMessage(content=full_query)]
-    }
+    Args:
+        mode (str): Mode de streaming de l'élément ("updates", "messages" ou "custom").
+        chunk: Contenu de l'élément.
+        messages (list): Messages produits par les nœuds, complétés au fil du flux.
     
-    # Exécuter le graph avec Langfuse tracing
-    result = graph.invoke(
-        initial_state,
-        config={"callbacks": [langfuse_handler]}
-    )
+    Yields:
+        dict: Événements de progression.
+    """
+    if mode == "custom":
+        yield chunk
+    elif mode == "updates":
+        for node, update in chunk.items():
+            node_messages = (update or {}).get("messages", [])
+            messages.extend(node_messages)
+            if node == "agent" and node_messages:
+                yield {"type": "routing", "tools": [tool_call["name"] for tool_call in getattr(node_messages[-1], "tool_calls", [])]}
+    elif mode == "messages":
+        message, metadata = chunk
+        # Ne diffuser que les tokens générés par les LLM des outils
+        if metadata.get("langgraph_node") == "tool" and isinstance(message, AIMessage) and message.content:
+            yield {"type": "token", "tool": metadata.get("tool_name"), "content": message.content}
+
+# Fonction pour exécuter l'agent en streaming
+def stream_agent_with_law_text(law_text: str, user_request: str, max_tokens: int = None, speculative: bool = SPECULATIVE_PREFETCH, session_id: str = None):
+    """
+    Variante streaming de `run_agent_with_law_text` : produit les événements du graphe au fur et à mesure.
     
-    # Extraire les résultats des tools uniquement
-    tool_results = []
-    for message in result["messages"]:
-        if type(message).__name__ == "ToolMessage":
-            tool_results.append(f"## {message.name}\n\n{message.content}\n\n---\n")
+    Événements produits (dict avec une clé "type") :
+        - {"type": "routing", "tools": [...]} : outils choisis par le routeur
+        - {"type": "tool_start", "tool": nom} : démarrage d'un outil
+        - {"type": "token", "tool": nom, "content": texte} : tokens générés par le LLM d'un outil
+        - {"type": "tool_end", "tool": nom, "status": ..., "content": résultat} : fin d'un outil
+          ("reused": True si le résultat d'un appel identique de la session est réutilisé)
+        - {"type": "done", "response": markdown} : réponse finale (identique à `run_agent_with_law_text`)
+    
+    Args:
+        law_text (str): Le texte de la loi à analyser.
+        user_request (str): La demande de l'utilisateur (résumé, analyse, etc.)
+        max_tokens (int): Budget de tokens du texte traité (défaut : document complet)
+        speculative (bool): Si True, précharge le chemin presse pendant le routage.
+        session_id (str): Identifiant de la session de l'utilisateur (conversation suivie).
+    
+    Yields:
+        dict: Événements de progression.
+    """
+    doc_id, law_text_prepared, initial_state = _build_initial_state(law_text, user_request, max_tokens, session_id)
+    run_graph, run_config = (get_session_graph(), _session_config(session_id, doc_id)) if session_id else (graph, {})
+    
+    # Décision de traçage (mode sampled) prise une fois pour toute la requête
+    with trace_root():
+        if speculative:
+            press_prefetcher.start(doc_id, law_text_prepared)
+    
+        messages = []
+        try:
+            for mode, chunk in run_graph.stream(
+                initial_state,
+                config=callbacks_config(**run_config),
+                stream_mode=STREAM_MODES
+            ):
+                yield from _stream_events(mode, chunk, messages)
+        finally:
+            if speculative:
+                press_prefetcher.discard(doc_id)
+    
+        yield {"type": "done", "response": _format_tool_results(messages)}
+
+# Fonction pour exécuter l'agent de façon asynchrone (serveur de jobs)
+async def astream_agent_with_law_text(law_text: str, user_request: str, max_tokens: int = None, speculative: bool = SPECULATIVE_PREFETCH, session_id: str = None):
+    """
+    Variante asynchrone de `stream_agent_with_law_text` (mêmes événements), exécutée avec `graph.astream`.
+    La préparation du document (normalisation, compaction) est faite dans un thread.
+    
+    Args:
+        law_text (str): Le texte de la loi à analyser.
+        user_request (str): La demande de l'utilisateur (résumé, analyse, etc.)
+        max_tokens (int): Budget de tokens du texte traité (défaut : document complet)
+        speculative (bool): Si True, précharge le chemin presse pendant le routage.
+        session_id (str): Identifiant de la session de l'utilisateur (conversation suivie).
+    
+    Yields:
+        dict: Événements de progression.
+    """
+    doc_id, law_text_prepared, initial_state = await asyncio.to_thread(_build_initial_state, law_text, user_request, max_tokens, session_id)
+    run_graph, run_config = (await aget_session_graph(), _session_config(session_id, doc_id)) if session_id else (graph, {})
     
-    return "\n".join(tool_results) if tool_results else "Aucune réponse générée."
\ No newline at end of file
+    with trace_root():
+        if speculative:
+            press_prefetcher.start(doc_id, law_text_prepared)
+    
+        messages = []
+        try:
+            async for mode, chunk in run_graph.astream(
+                initial_state,
+                config=callbacks_config(**run_config),
+                stream_mode=STREAM_MODES
+            ):
+                for event in _stream_events(mode, chunk, messages):
+                    yield event
+        finally:
+            if speculative:
+                press_prefetcher.discard(doc_id)
+    
+        yield {"type": "done", "response": _format_tool_results(messages)}
+
+
+if __name__ == "__main__":
+    # Régénérer l'image du graphe : python pipeline.py
+    generate_graph_png(force=True)
@@ -0,0 +1,83 @@
+import threading
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from tone_analysis_agent import create_law_title
+from news_search import news_search, news_search_queries
+from outbound import request_priority, PRIORITY_NORMAL
+from compaction import compact_document
+from config import TITLE_CONTEXT_TOKENS, PREFETCH_MAX_WORKERS
+
+
+class PressPrefetcher:
+    """
+    Préchargement spéculatif du chemin « analyse presse ».
+
+    Pendant que le routeur choisit ses outils, le titre de la loi est généré et la
+    recherche de presse est lancée en arrière-plan. Si le routeur choisit
+    `tone_analysis_tool`, le titre est récupéré sans nouvel appel LLM et la recherche
+    est servie par le cache de `news_search`. Sinon, le préchargement est annulé
+    s'il n'a pas démarré ; ses résultats restent sinon dans les caches (LLM et presse).
+    """
+
+    def __init__(self, max_workers: int = PREFETCH_MAX_WORKERS):
+        self._executor = ContextThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prefetch(law_text: str) -> str:
+        """Génère le titre de la loi puis précharge la recherche de presse correspondante."""
+        # Travail spéculatif, mais attendu par tone_analysis_tool (take_title) : priorité des outils,
+        # pour ne pas passer derrière les résumés map-reduce et les lots ; le routeur reste prioritaire
+        with request_priority(PRIORITY_NORMAL):
+            law_title = create_law_title(compact_document(law_text, TITLE_CONTEXT_TOKENS))
+            # Les erreurs sont ignorées : la recherche sera retentée (et l'erreur signalée)
+            # par analyze_tone_of_voice
+            news_search.search_many(news_search_queries(law_title))
+        return law_title
+
+    def start(self, doc_id: str, law_text: str) -> None:
+        """
+        Lance le préchargement pour un document (sans effet s'il est déjà en cours).
+
+        Args:
+            doc_id (str): Identifiant du document.
+            law_text (str): Texte complet du document.
+        """
+        with self._lock:
+            if doc_id not in self._futures:
+                self._futures[doc_id] = self._executor.submit(self._prefetch, law_text)
+
+    def take_title(self, doc_id: str):
+        """
+        Récupère le titre préchargé d'un document, en attendant la fin du préchargement si besoin.
+
+        Args:
+            doc_id (str): Identifiant du document.
+
+        Returns:
+            str | None: Titre généré, ou None si aucun préchargement n'est disponible.
+        """
+        with self._lock:
+            future = self._futures.pop(doc_id, None)
+        if future is None or future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def discard(self, doc_id: str) -> None:
+        """
+        Abandonne le préchargement d'un document non utilisé par le routeur.
+
+        Args:
+            doc_id (str): Identifiant du document.
+        """
+        with self._lock:
+            future = self._futures.pop(doc_id, None)
+        if future is not None:
+            future.cancel()
+
+
+# Préchargeur global partagé par le pipeline
+press_prefetcher = PressPrefetcher()
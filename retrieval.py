@@ -0,0 +1,287 @@
+"""
+Index lexical (BM25) des passages d'un texte de loi.
+
+Le document est segmenté selon sa structure (exposé des motifs, articles), puis chaque
+section est découpée en passages de `RETRIEVAL_PASSAGE_TOKENS` tokens. Les poids BM25
+sont précalculés dans une matrice creuse (SciPy CSR) passages × termes : une recherche
+se réduit à la somme de quelques colonnes.
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from tokenizer import chunk_text
+from document_registry import DocumentRegistry
+from config import (
+    RETRIEVAL_PASSAGE_TOKENS,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_MIN_RELATIVE_SCORE,
+    RETRIEVAL_BM25_K1,
+    RETRIEVAL_BM25_B,
+    RETRIEVAL_MAX_INDEXES,
+)
+
+# Intitulés de sections, seuls sur leur ligne (les renvois « l'article 4 de la loi… » sont ignorés)
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?:(?P<expose>expos[ée] des motifs)"
+    r"|(?P<dispositif>(?:proposition|projet) de loi(?: organique)?)"
+    r"|(?P<article>article[ \t]+(?:premier|1er|\d+)(?:[ \t]*(?:bis|ter|quater|quinquies|[A-Z]))?))"
+    r"[ \t]*\.?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_ARTICLE_QUERY_RE = re.compile(r"\barticle\s+(premier|1er|\d+)\b", re.IGNORECASE)
+
+_STOPWORDS = frozenset("""
+a au aux avec ce ces cet cette d dans de des du elle en et eux il ils je l la le les leur leurs lui
+m ma mais me meme mes moi mon n ne nos notre nous on ou par pas pour qu que qui s sa se ses si son
+sur t ta te tes toi ton tu un une vos votre vous y est sont ete etre a ont cela ceci dont ainsi
+""".split())
+
+
+def is_section_heading(line: str) -> bool:
+    """Indique si une ligne est un intitulé de section (« Exposé des motifs », « Article 4 »...)."""
+    return _HEADING_RE.fullmatch(line) is not None
+
+
+def _article_key(label: str) -> str:
+    """Numéro normalisé d'un article (« premier » et « 1er » valent « 1 »)."""
+    number = label.split()[-1].lower() if label.split() else ""
+    return "1" if number in ("premier", "1er") else number
+
+
+def search_terms(text: str) -> list:
+    """
+    Découpe un texte en termes de recherche : minuscules sans accents, mots vides retirés,
+    pluriels simples ramenés au singulier, « 1er » ramené à « 1 ».
+
+    Args:
+        text (str): Texte à analyser.
+
+    Returns:
+        list[str]: Termes, dans l'ordre du texte.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    terms = []
+    for term in re.findall(r"[a-z0-9]+", text):
+        if term in _STOPWORDS:
+            continue
+        if term == "1er":
+            term = "1"
+        elif len(term) > 4 and term[-1] in "sx" and not term.isdigit():
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+@dataclass
+class Passage:
+    """Passage d'un document : intitulé de sa section et texte."""
+    section: str
+    text: str
+
+    def render(self) -> str:
+        return f"[{self.section}]\n{self.text}"
+
+
+def segment_document(text: str, max_tokens: int = RETRIEVAL_PASSAGE_TOKENS) -> list:
+    """
+    Segmente un texte de loi en passages selon sa structure.
+
+    Les sections (préambule, titre, exposé des motifs, dispositif, articles) sont délimitées par
+    les intitulés « Exposé des motifs », « Proposition de loi » et « Article N » ; chaque section
+    est découpée en passages alignés sur les paragraphes.
+
+    Args:
+        text (str): Texte du document.
+        max_tokens (int): Taille maximale (en tokens) d'un passage.
+
+    Returns:
+        list[Passage]: Passages, dans l'ordre du document.
+    """
+    sections = []
+    label, start = "Préambule", 0
+    seen_expose = False
+    for match in _HEADING_RE.finditer(text):
+        sections.append((label, text[start:match.start()]))
+        if match.group("expose"):
+            label, seen_expose = "Exposé des motifs", True
+        elif match.group("dispositif"):
+            # Avant l'exposé des motifs, « Proposition de loi » est l'intitulé de la page de titre
+            label = "Dispositif" if seen_expose else "Titre"
+        else:
+            label = " ".join(match.group("article").split()).capitalize()
+        start = match.end()
+    sections.append((label, text[start:]))
+
+    return [
+        Passage(section=label, text=chunk)
+        for label, body in sections
+        for chunk in chunk_text(body, max_tokens)
+    ]
+
+
+class BM25Index:
+    """
+    Index BM25 des passages d'un document.
+
+    La matrice `weights` (passages × termes, format CSR) contient directement les scores
+    BM25 de chaque terme dans chaque passage ; le score d'une requête est la somme des
+    colonnes de ses termes.
+    """
+
+    def __init__(self, passages: list, vocabulary: dict, weights):
+        self.passages = passages
+        self.vocabulary = vocabulary
+        self.weights = weights
+
+    @classmethod
+    def build(cls, text: str, k1: float = RETRIEVAL_BM25_K1, b: float = RETRIEVAL_BM25_B) -> "BM25Index":
+        """
+        Segmente un document et construit son index.
+
+        Args:
+            text (str): Texte du document.
+            k1 (float): Saturation de la fréquence des termes.
+            b (float): Normalisation par la longueur des passages.
+
+        Returns:
+            BM25Index: Index du document.
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        passages = segment_document(text)
+        vocabulary = {}
+        rows, cols = [], []
+        for row, passage in enumerate(passages):
+            # L'intitulé de section est indexé avec le passage (« article 4 »)
+            for term in search_terms(f"{passage.section} {passage.text}"):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        shape = (len(passages), len(vocabulary))
+        counts = csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        counts.sum_duplicates()
+        if counts.nnz == 0:
+            return cls(passages, vocabulary, counts)
+
+        lengths = np.asarray(counts.sum(axis=1)).ravel()
+        document_frequency = np.bincount(counts.indices, minlength=shape[1])
+        idf = np.log1p((shape[0] - document_frequency + 0.5) / (document_frequency + 0.5))
+        row_of_entry = np.repeat(np.arange(shape[0]), np.diff(counts.indptr))
+        tf = counts.data
+        norm = k1 * (1 - b + b * lengths[row_of_entry] / lengths.mean())
+        weights = csr_matrix(
+            (idf[counts.indices] * tf * (k1 + 1) / (tf + norm), counts.indices, counts.indptr), shape=shape
+        )
+        return cls(passages, vocabulary, weights)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, min_relative_score: float = RETRIEVAL_MIN_RELATIVE_SCORE) -> list:
+        """
+        Retourne les passages les plus pertinents pour une requête.
+        Les passages de l'article cité dans la requête (« article 4 ») sont placés en tête.
+
+        Args:
+            query (str): Requête (question de l'utilisateur, partie visée).
+            k (int): Nombre maximum de passages.
+            min_relative_score (float): Score minimal d'un passage, relatif au meilleur score.
+
+        Returns:
+            list[Passage]: Passages retenus, dans l'ordre du document.
+        """
+        import numpy as np
+
+        if not self.passages:
+            return []
+        columns = sorted({self.vocabulary[term] for term in search_terms(query) if term in self.vocabulary})
+        scores = np.asarray(self.weights[:, columns].sum(axis=1)).ravel() if columns else np.zeros(len(self.passages))
+
+        cited = {_article_key(number) for number in _ARTICLE_QUERY_RE.findall(query)}
+        if cited:
+            boost = scores.max() + 1
+            for row, passage in enumerate(self.passages):
+                if passage.section.startswith("Article") and _article_key(passage.section) in cited:
+                    scores[row] += boost
+
+        k = min(k, len(self.passages))
+        if not scores.any():
+            # Aucun terme commun : le début du document sert de contexte par défaut
+            return self.passages[:k]
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Les passages qui ne partagent que des termes secondaires avec la requête sont écartés
+        threshold = scores.max() * min_relative_score
+        return [self.passages[row] for row in sorted(row for row in top if scores[row] > 0 and scores[row] >= threshold)]
+
+    def to_dict(self) -> dict:
+        """Sérialise l'index (stocké avec l'extraction du PDF)."""
+        return {
+            "passages": [[passage.section, passage.text] for passage in self.passages],
+            "vocabulary": list(self.vocabulary),
+            "data": [round(float(value), 5) for value in self.weights.data],
+            "indices": self.weights.indices.tolist(),
+            "indptr": self.weights.indptr.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        """Reconstruit un index sérialisé par `to_dict`."""
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        passages = [Passage(section=section, text=text) for section, text in data["passages"]]
+        vocabulary = {term: column for column, term in enumerate(data["vocabulary"])}
+        weights = csr_matrix(
+            (np.asarray(data["data"], dtype=np.float32), np.asarray(data["indices"]), np.asarray(data["indptr"])),
+            shape=(len(passages), len(vocabulary)),
+        )
+        return cls(passages, vocabulary, weights)
+
+
+class DocumentIndexCache:
+    """Index des documents en mémoire (LRU), adressés par l'identifiant de contenu du texte."""
+
+    def __init__(self, max_indexes: int = RETRIEVAL_MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str, index: BM25Index) -> None:
+        """
+        Enregistre l'index d'un texte (par exemple relu avec l'extraction du PDF).
+
+        Args:
+            text (str): Texte indexé.
+            index (BM25Index): Index du texte.
+        """
+        doc_id = DocumentRegistry.compute_doc_id(text)
+        with self._lock:
+            self._indexes[doc_id] = index
+            self._indexes.move_to_end(doc_id)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+
+    def get_or_build(self, text: str) -> BM25Index:
+        """
+        Retourne l'index d'un texte, construit au premier appel.
+
+        Args:
+            text (str): Texte du document.
+
+        Returns:
+            BM25Index: Index du texte.
+        """
+        doc_id = DocumentRegistry.compute_doc_id(text)
+        with self._lock:
+            index = self._indexes.get(doc_id)
+            if index is not None:
+                self._indexes.move_to_end(doc_id)
+                return index
+        index = BM25Index.build(text)
+        self.put(text, index)
+        return index
+
+
+# Index global partagé par le pipeline
+document_indexes = DocumentIndexCache()
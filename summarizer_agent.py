@@ -1,20 +1,78 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-from langfuse import observe
-from config import langfuse_handler
-
-# Initialiser le LLM
-llm = ChatOpenAI(
-    model="gpt-4o-mini", 
-    temperature=0.1
+from tokenizer import chunk_text, count_tokens, group_by_tokens
+from llm_client import get_llm
+from outbound import request_priority, PRIORITY_BATCH
+from tracing import observe, callbacks_config
+from config import (
+    SUMMARY_SINGLE_PASS_TOKENS,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_REDUCE_TOKENS,
+    SUMMARY_MAX_CONCURRENCY,
 )
 
+SYSTEM_MESSAGE = SystemMessage(content="Tu es un assistant juridique spécialisé dans les lois françaises.")
+
+
+def _summary_chain(messages):
+    """Construit la chaîne prompt | llm | parser pour une liste de messages."""
+    prompt = ChatPromptTemplate.from_messages(messages)
+    return prompt | get_llm() | StrOutputParser()
+
+
+def _batch_summaries(message_lists, max_concurrency: int) -> list:
+    """
+    Exécute plusieurs appels LLM en parallèle, avec un nombre borné d'appels simultanés.
+
+    Args:
+        message_lists (list): Une liste de messages par appel.
+        max_concurrency (int): Nombre maximum d'appels simultanés.
+
+    Returns:
+        list[str]: Réponses, dans l'ordre des entrées.
+    """
+    chain = ChatPromptTemplate.from_messages([("placeholder", "{messages}")]) | get_llm() | StrOutputParser()
+    # Les résumés intermédiaires ne sont pas diffusés en streaming et cèdent la priorité
+    # aux appels interactifs (routeur) dans la file de la couche sortante
+    with request_priority(PRIORITY_BATCH):
+        return chain.batch(
+            [{"messages": messages} for messages in message_lists],
+            config=callbacks_config(max_concurrency=max_concurrency, tags=["nostream"])
+        )
+
+
+@observe(name="summarize_boilerplate")
+def summarize_boilerplate(paragraphs: list, max_concurrency: int = SUMMARY_MAX_CONCURRENCY) -> list:
+    """
+    Résumer en une phrase des paragraphes types, communs à de nombreux textes de loi.
+    Les mini-résumés sont conservés par `boilerplate.py` et réutilisés pour tous les documents.
+
+    Args:
+        paragraphs (list[str]): Paragraphes types.
+        max_concurrency (int): Nombre maximum d'appels LLM simultanés.
+
+    Returns:
+        list[str]: Mini-résumés, dans l'ordre des paragraphes.
+    """
+    summaries = _batch_summaries(
+        [
+            [
+                SYSTEM_MESSAGE,
+                HumanMessage(content=f"Voici un paragraphe type, repris à l'identique dans de nombreux textes de loi :\n{paragraph}\n\nRésume-le en une seule phrase de moins de 25 mots, en conservant sa portée juridique. Donne uniquement la phrase.\n\nRésumé :")
+            ]
+            for paragraph in paragraphs
+        ],
+        max_concurrency,
+    )
+    return [" ".join(summary.split()) for summary in summaries]
+
+
 @observe(name="summarize_law_text")
 def summarize_law_text(law_text):
     """
     Résumer un texte de loi.
+    Les documents trop longs pour un seul appel sont résumés en map-reduce.
 
     Args:
         law_text (str): Texte brut de la loi.
@@ -22,16 +80,116 @@ def summarize_law_text(law_text):
     Returns:
         str: Résumé intelligible du texte de loi.
     """
+    if count_tokens(law_text) > SUMMARY_SINGLE_PASS_TOKENS:
+        return summarize_law_text_map_reduce(law_text)
+
     messages = [
-        SystemMessage(content="Tu es un assistant juridique spécialisé dans les lois françaises."),
+        SYSTEM_MESSAGE,
         HumanMessage(content=f"""Voici un texte de loi :\n{law_text}\n
-                     \nRédige un résumé clair, concis et compréhensible pour un citoyen lambda. 
+                     \nRédige un résumé clair, concis et compréhensible pour un citoyen lambda.
                      N'hésite pas à simplifier le jargon juridique de manière pédagogique.\n\nRésumé :""")
     ]
 
-    prompt = ChatPromptTemplate.from_messages(messages)
-    chain = prompt | llm | StrOutputParser()
+    chain = _summary_chain(messages)
     return chain.invoke(
         {"law_text": law_text},
-        config={"callbacks": [langfuse_handler]}
-        )
\ No newline at end of file
+        config=callbacks_config()
+        )
+
+
+@observe(name="summarize_passages")
+def summarize_passages(passages: list, focus: str):
+    """
+    Résumer les passages d'un texte de loi retenus pour une demande ciblée.
+
+    Args:
+        passages (list[Passage]): Passages pertinents (section et texte), dans l'ordre du document.
+        focus (str): Partie ou question visée par l'utilisateur.
+
+    Returns:
+        str: Résumé intelligible centré sur la demande.
+    """
+    excerpts = "\n\n".join(passage.render() for passage in passages)
+    messages = [
+        SYSTEM_MESSAGE,
+        HumanMessage(content=f"""Voici les passages d'un texte de loi les plus pertinents pour la demande « {focus} » :\n{excerpts}\n
+                     \nRédige un résumé clair, concis et compréhensible pour un citoyen lambda, centré sur cette demande.
+                     Appuie-toi uniquement sur ces passages et cite les articles concernés. N'hésite pas à simplifier le jargon juridique.\n\nRésumé :""")
+    ]
+    chain = _summary_chain(messages)
+    return chain.invoke(
+        {"law_text": excerpts},
+        config=callbacks_config()
+        )
+
+
+@observe(name="summarize_law_text_map_reduce")
+def summarize_law_text_map_reduce(
+    law_text: str,
+    chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+    reduce_tokens: int = SUMMARY_REDUCE_TOKENS,
+    max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+):
+    """
+    Résumer un texte de loi complet en map-reduce.
+
+    1. Map : le texte est découpé en morceaux de `chunk_tokens` tokens, résumés en parallèle.
+    2. Reduce : les résumés partiels sont regroupés par paquets de `reduce_tokens` tokens
+       et fusionnés en parallèle, niveau par niveau, jusqu'à tenir dans un seul appel.
+    3. Le résumé final pédagogique est rédigé à partir des résumés fusionnés.
+
+    La durée dépend du nombre de niveaux de réduction, pas de la longueur du document.
+
+    Args:
+        law_text (str): Texte brut de la loi.
+        chunk_tokens (int): Taille maximale (en tokens) d'un morceau du texte.
+        reduce_tokens (int): Taille maximale (en tokens) d'un paquet de résumés à fusionner.
+        max_concurrency (int): Nombre maximum d'appels LLM simultanés.
+
+    Returns:
+        str: Résumé intelligible du texte de loi.
+    """
+    chunks = chunk_text(law_text, chunk_tokens)
+    total = len(chunks)
+
+    # Map : résumé de chaque extrait
+    summaries = _batch_summaries(
+        [
+            [
+                SYSTEM_MESSAGE,
+                HumanMessage(content=f"Voici un extrait (partie {i}/{total}) d'un texte de loi :\n{chunk}\n\nRésume de manière factuelle les dispositions et informations essentielles de cet extrait (articles, mesures, objectifs). Ne rédige pas d'introduction.\n\nRésumé de l'extrait :")
+            ]
+            for i, chunk in enumerate(chunks, 1)
+        ],
+        max_concurrency,
+    )
+
+    # Reduce hiérarchique : fusionner les résumés par paquets jusqu'à tenir dans un seul appel
+    while len(summaries) > 1 and count_tokens("\n\n".join(summaries)) > reduce_tokens:
+        # Chaque résumé partiel reste entier, dans un seul paquet
+        groups = group_by_tokens(summaries, reduce_tokens)
+        if len(groups) >= len(summaries):
+            break
+        summaries = _batch_summaries(
+            [
+                [
+                    SYSTEM_MESSAGE,
+                    HumanMessage(content=f"Voici des résumés partiels consécutifs d'un même texte de loi :\n{group}\n\nFusionne-les en un seul résumé factuel, sans perdre de disposition importante ni répéter d'information.\n\nRésumé fusionné :")
+                ]
+                for group in groups
+            ],
+            max_concurrency,
+        )
+
+    combined = "\n\n".join(summaries)
+    messages = [
+        SYSTEM_MESSAGE,
+        HumanMessage(content=f"""Voici les résumés successifs des différentes parties d'un texte de loi :\n{combined}\n
+                     \nRédige un résumé clair, concis et compréhensible pour un citoyen lambda de l'ensemble du texte.
+                     N'hésite pas à simplifier le jargon juridique de manière pédagogique.\n\nRésumé :""")
+    ]
+    chain = _summary_chain(messages)
+    return chain.invoke(
+        {"law_text": combined},
+        config=callbacks_config()
+        )
@@ -0,0 +1,145 @@
+import re
+from functools import lru_cache
+
+# Encodage utilisé par gpt-4o / gpt-4o-mini
+DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str = DEFAULT_ENCODING):
+    """Charge l'encodage tiktoken (None si tiktoken est indisponible)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Compte les tokens d'un texte avec le tokenizer du modèle.
+    En l'absence de tiktoken, utilise l'approximation de 4 caractères par token.
+
+    Args:
+        text (str): Texte à mesurer.
+
+    Returns:
+        int: Nombre de tokens.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int) -> list:
+    """
+    Découpe un texte en morceaux d'au plus `max_tokens` tokens.
+
+    Args:
+        text (str): Texte à découper.
+        max_tokens (int): Nombre maximum de tokens par morceau.
+
+    Returns:
+        list[str]: Morceaux de texte.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        step = max_tokens * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def split_sentences(text: str, max_tokens: int) -> list:
+    """
+    Découpe un paragraphe trop long en morceaux d'au plus `max_tokens` tokens,
+    de préférence aux fins de phrases ; une phrase trop longue est découpée par tokens.
+
+    Args:
+        text (str): Paragraphe à découper.
+        max_tokens (int): Nombre maximum de tokens par morceau.
+
+    Returns:
+        list[str]: Morceaux de texte.
+    """
+    pieces = []
+    current, current_tokens = [], 0
+    for sentence in re.split(r"(?<=[.!?;])\s+", text):
+        sentence_tokens = count_tokens(sentence) + 1
+        if current and current_tokens + sentence_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        if sentence_tokens > max_tokens:
+            pieces.extend(split_by_tokens(sentence, max_tokens))
+            continue
+        current.append(sentence)
+        current_tokens += sentence_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """
+    Regroupe les paragraphes d'un texte en morceaux d'au plus `max_tokens` tokens.
+    Les coupures se font aux limites de paragraphes ; un paragraphe trop long
+    est lui-même découpé aux fins de phrases, puis par tokens.
+
+    Args:
+        text (str): Texte à découper.
+        max_tokens (int): Budget de tokens par morceau.
+
+    Returns:
+        list[str]: Morceaux de texte, dans l'ordre du document.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split("\n"):
+        if not paragraph.strip():
+            continue
+        paragraph_tokens = count_tokens(paragraph) + 1
+        if paragraph_tokens > max_tokens:
+            pieces = split_sentences(paragraph, max_tokens)
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = paragraph_tokens if len(pieces) == 1 else count_tokens(piece) + 1
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def group_by_tokens(texts: list, max_tokens: int, separator: str = "\n\n") -> list:
+    """
+    Regroupe des textes consécutifs en paquets d'au plus `max_tokens` tokens, sans les
+    couper : un texte plus long que le budget forme un paquet à lui seul.
+
+    Args:
+        texts (list[str]): Textes à regrouper, dans l'ordre.
+        max_tokens (int): Budget de tokens par paquet (séparateurs compris).
+        separator (str): Séparateur entre les textes d'un paquet.
+
+    Returns:
+        list[str]: Paquets (textes joints par `separator`), dans l'ordre.
+    """
+    groups = []
+    current = []
+    current_tokens = 0
+    separator_tokens = count_tokens(separator)
+    for text in texts:
+        text_tokens = count_tokens(text) + separator_tokens
+        if current and current_tokens + text_tokens > max_tokens:
+            groups.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += text_tokens
+    if current:
+        groups.append(separator.join(current))
+    return groups
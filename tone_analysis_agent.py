@@ -1,15 +1,13 @@
-from langchain_openai import ChatOpenAI
+import logging
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
-from serpapi import GoogleSearch
-from langfuse import observe
-from config import SERP_API_KEY, langfuse_handler
-
-llm = ChatOpenAI(
-    model="gpt-4o-mini", 
-    temperature=0.1
-)
+from llm_client import get_llm
+from news_search import news_search, news_search_queries, is_negative_result
+from news_digest import build_news_digest
+from tokenizer import count_tokens
+from metrics import log_event
+from tracing import observe, callbacks_config
 
 @observe(name="create_law_title")
 def create_law_title(law_text: str) -> str:
@@ -28,15 +26,20 @@ def create_law_title(law_text: str) -> str:
     ]
 
     prompt = ChatPromptTemplate.from_messages(messages)
-    chain = prompt | llm | StrOutputParser()
+    chain = prompt | get_llm() | StrOutputParser()
+    # Le titre est intermédiaire : il n'est pas diffusé en streaming
     title = chain.invoke(
         {"law_text": law_text},
-        config={"callbacks": [langfuse_handler]}
+        config=callbacks_config(tags=["nostream"])
         )
     # Nettoyer le titre (retirer guillemets et caractères spéciaux)
     title = title.replace('"', '').replace("'", "").strip()
     return title
 
+def _no_articles_message(law_title: str) -> str:
+    """Message affiché quand la recherche de presse ne trouve aucun article."""
+    return f"Aucun article de presse trouvé pour '{law_title}'.\n\nCela peut signifier que :\n- La loi est très récente et n'a pas encore été couverte par la presse\n- Le titre est trop spécifique\n- Il s'agit d'un texte législatif peu médiatisé\n\nTentez avec un autre document ou reformulez le titre."
+
 @observe(name="analyze_tone_of_voice")
 def analyze_tone_of_voice(law_title: str):
     """
@@ -48,95 +51,54 @@ def analyze_tone_of_voice(law_title: str):
     Returns:
         str: Analyse du tone of voice des médias.
     """
-    # Nettoyer et simplifier le titre pour la recherche
-    search_query = law_title.replace('"', '').strip()
-    
-    try:
-        search = GoogleSearch({
-            "q": search_query,
-            "engine": "google_news",
-            "hl": "fr",
-            "gl": "fr",
-            "api_key": SERP_API_KEY
-        })
-        results = search.get_dict()
-    except Exception as e:
-        return f"Erreur lors de la recherche SerpAPI : {str(e)}"
+    # Titre complet et sujet recherchés simultanément via le cache partagé (TTL, résultats
+    # négatifs inclus, requêtes simultanées coalescées) : un titre sans résultat ne coûte pas
+    # un aller-retour de plus. La première réponse non vide, par ordre de préférence, est retenue.
+    queries = news_search_queries(law_title)
+    if not queries:
+        # Titre vide (ou fait uniquement de guillemets) : rien à rechercher
+        return _no_articles_message(law_title)
+    responses = news_search.search_many(queries)
+    errors = [str(response) for response in responses if isinstance(response, Exception)]
+    if len(errors) == len(queries):
+        return f"Erreur lors de la recherche SerpAPI : {errors[0]}"
+    query, results = next(
+        ((q, r) for q, r in zip(queries, responses) if not isinstance(r, Exception) and not is_negative_result(r)),
+        (queries[0], {}),
+    )
+    log_event("news_search", logging.DEBUG, query=query, queries=queries, keys=list(results.keys()), errors=errors)
 
-    # Debug: afficher la structure de la réponse
-    print(f"Debug - Recherche pour: {search_query}")
-    print(f"Debug - Clés disponibles: {list(results.keys())}")
-    
-    if "error" in results:
-        # Si pas de résultats, essayer avec des mots-clés plus simples
-        keywords = " ".join(search_query.split()[:3])  # Prendre seulement les 3 premiers mots
-        print(f"Debug - Tentative avec mots-clés simplifiés: {keywords}")
-        try:
-            search = GoogleSearch({
-                "q": keywords,
-                "engine": "google_news",
-                "hl": "fr",
-                "gl": "fr",
-                "api_key": SERP_API_KEY
-            })
-            results = search.get_dict()
-        except Exception as e:
-            return f"Aucun article trouvé même avec une recherche simplifiée. Le sujet est peut-être trop récent ou peu médiatisé."
-    
-    # Essayer différentes clés possibles pour les résultats
-    articles = results.get("news_results", results.get("articles", []))
-    
-    if not articles:
-        return f"Aucun article de presse trouvé pour '{law_title}'.\n\nCela peut signifier que :\n- La loi est très récente et n'a pas encore été couverte par la presse\n- Le titre est trop spécifique\n- Il s'agit d'un texte législatif peu médiatisé\n\nTentez avec un autre document ou reformulez le titre."
-    
-    print(f"Debug - Nombre d'articles trouvés: {len(articles)}")
-    
-    # Construire la liste des articles
-    analysis = []
-    articles_info = []
-    
-    for article in articles[:10]:  # Limiter à 10 articles pour éviter les dépassements
-        title = article.get('title', 'Titre non disponible')
-        source = article.get('source', {})
-        if isinstance(source, dict):
-            source_name = source.get('name', 'Source inconnue')
-        else:
-            source_name = str(source)
-        link = article.get('link', 'Lien non disponible')
-        
-        # Pour l'analyse par le LLM
-        analysis.append(f"Titre : {title}\nSource : {source_name}\nLien : {link}\n")
-        
-        # Pour l'affichage avec bullet points
-        articles_info.append({
-            'title': title,
-            'source': source_name,
-            'link': link
-        })
-    
-    analysis_text = "\n\n".join(analysis)
-    
-    if not analysis_text.strip():
-        return f"Aucune information exploitable trouvée pour '{law_title}'."
+    # Quasi-doublons regroupés (dépêches reprises), sources diversifiées
+    digest = build_news_digest(results)
+
+    if not digest.items:
+        return _no_articles_message(law_title)
+
+    analysis_text = digest.render()
+    log_event(
+        "news_digest", logging.DEBUG, query=query, articles=digest.articles, clusters=digest.clusters,
+        sources=digest.sources, selected=len(digest.items), tokens=count_tokens(analysis_text),
+    )
 
     messages = [
         SystemMessage(content="Tu es un expert en analyse médiatique."),
-        HumanMessage(content=f"Voici une liste d'articles de presse concernant le titre de loi '{law_title}' :\n\n{analysis_text}\n\nAnalyse le tone of voice général des médias à propos de cette loi. En fonction du parti rattaché à ce média, déduis-en la manière dont ce texte de loi est reçu par le paysage médiatique. Justifie ton analyse.")]
+        HumanMessage(content=f"Voici une liste d'articles de presse concernant le titre de loi '{law_title}' ({digest.articles} articles trouvés, {digest.sources} médias). Chaque ligne indique le média et le titre ; « ×N » signale une même dépêche reprise par N articles, suivie des autres médias qui l'ont reprise :\n\n{analysis_text}\n\nAnalyse le tone of voice général des médias à propos de cette loi. En fonction du parti rattaché à ce média, déduis-en la manière dont ce texte de loi est reçu par le paysage médiatique. Justifie ton analyse.")]
     prompt = ChatPromptTemplate.from_messages(messages)
-    chain = prompt | llm | StrOutputParser()
+    chain = prompt | get_llm() | StrOutputParser()
     
     # Générer l'analyse avec gestion d'erreur
     try:
         tone_analysis = chain.invoke(
             {"analysis_text": analysis_text},
-            config={"callbacks": [langfuse_handler]}
+            config=callbacks_config()
         )
     except Exception as e:
         return f"Erreur lors de l'analyse du ton médiatique : {str(e)}"
     
     # Ajouter la liste des articles avec bullet points et liens
     articles_list = "\n\n---\n\n### 📰 Articles analysés :\n\n"
-    for i, article in enumerate(articles_info, 1):
-        articles_list += f"**{i}. {article['source']}** : [{article['title']}]({article['link']})\n\n"
+    for i, item in enumerate(digest.items, 1):
+        coverage = f" — repris par {item.cluster_size} articles" if item.cluster_size > 1 else ""
+        articles_list += f"**{i}. {item.source}** : [{item.title}]({item.link}){coverage}\n\n"
     
     return tone_analysis + articles_list
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Traçage Langfuse configurable (`TRACING_MODE`) : complet, échantillonné ou désactivé.
+
+- "off" : `observe` renvoie la fonction telle quelle et aucun callback n'est ajouté.
+  Surcoût quasi nul, Langfuse n'est jamais importé.
+- "sampled" : la décision est prise une fois à la racine de chaque requête
+  (probabilité `TRACING_SAMPLE_RATE`), puis héritée par les appels imbriqués, threads
+  compris (contextvars). Une requête non échantillonnée n'exécute ni décorateur
+  Langfuse ni callback.
+- "full" : toutes les requêtes sont tracées.
+
+Les spans sont exportés par le SDK Langfuse (BatchSpanProcessor OpenTelemetry) :
+une file bornée en mémoire (`TRACING_QUEUE_MAX_SPANS`) est vidée par un thread de fond
+(par lots de `TRACING_FLUSH_AT`, au plus toutes les `TRACING_FLUSH_INTERVAL_SECONDS`).
+Quand la file est pleine, les spans sont abandonnés au lieu de bloquer les requêtes.
+"""
+import functools
+import os
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from langchain_core.runnables.config import var_child_runnable_config
+from metrics import registry
+from config import (
+    LANGFUSE_ENABLED,
+    LANGFUSE_PUBLIC_KEY,
+    LANGFUSE_SECRET_KEY,
+    LANGFUSE_BASE_URL,
+    TRACING_MODE,
+    TRACING_SAMPLE_RATE,
+    TRACING_QUEUE_MAX_SPANS,
+    TRACING_FLUSH_AT,
+    TRACING_FLUSH_INTERVAL_SECONDS,
+)
+
+TRACING_MODES = ("full", "sampled", "off")
+if TRACING_MODE not in TRACING_MODES:
+    raise ValueError(f"TRACING_MODE invalide : {TRACING_MODE!r} (valeurs possibles : {', '.join(TRACING_MODES)})")
+
+# Sans configuration Langfuse, le traçage est désactivé quel que soit le mode demandé
+tracing_mode = TRACING_MODE if LANGFUSE_ENABLED else "off"
+
+# Décision d'échantillonnage de la requête en cours (None : hors requête)
+_traced = ContextVar("traced", default=None)
+
+TRACE_DECISIONS = registry.counter("legal_assistant_trace_decisions_total", "Décisions d'échantillonnage des requêtes (mode sampled).", ("traced",))
+
+
+@lru_cache(maxsize=None)
+def get_langfuse_client():
+    """
+    Construit le client Langfuse partagé (utilisé par `observe` et le CallbackHandler).
+
+    Returns:
+        Langfuse: Client configuré avec la file d'export bornée.
+    """
+    # Taille de la file du BatchSpanProcessor (lue dans l'environnement par OpenTelemetry)
+    os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", str(TRACING_QUEUE_MAX_SPANS))
+    from langfuse import Langfuse
+
+    return Langfuse(
+        public_key=LANGFUSE_PUBLIC_KEY,
+        secret_key=LANGFUSE_SECRET_KEY,
+        base_url=LANGFUSE_BASE_URL,
+        flush_at=TRACING_FLUSH_AT,
+        flush_interval=TRACING_FLUSH_INTERVAL_SECONDS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_langfuse_handler():
+    """Retourne le CallbackHandler Langfuse partagé, construit au premier appel."""
+    get_langfuse_client()
+    from langfuse.langchain import CallbackHandler
+
+    return CallbackHandler(public_key=LANGFUSE_PUBLIC_KEY)
+
+
+def _decide() -> bool:
+    """Tire la décision de traçage d'une nouvelle requête selon le mode."""
+    if tracing_mode != "sampled":
+        return tracing_mode == "full"
+    traced = random.random() < TRACING_SAMPLE_RATE
+    TRACE_DECISIONS.inc(traced=str(traced).lower())
+    return traced
+
+
+def is_traced() -> bool:
+    """Indique si la requête en cours est tracée (décision tirée à la volée hors requête)."""
+    traced = _traced.get()
+    return _decide() if traced is None else traced
+
+
+@contextmanager
+def trace_root():
+    """
+    Ouvre une requête : la décision de traçage est tirée une fois et héritée par les appels imbriqués.
+    Sans effet à l'intérieur d'une requête déjà ouverte.
+
+    Yields:
+        bool: True si la requête est tracée.
+    """
+    traced = _traced.get()
+    if traced is not None or tracing_mode == "off":
+        yield bool(traced)
+        return
+    token = _traced.set(_decide())
+    try:
+        yield _traced.get()
+    finally:
+        try:
+            _traced.reset(token)
+        except ValueError:
+            # Générateur (streaming) refermé depuis un autre contexte : rien à restaurer
+            pass
+
+
+def observe(name: str):
+    """
+    Décorateur de traçage : équivalent de `langfuse.observe` selon le mode de traçage.
+
+    Args:
+        name (str): Nom du span.
+    """
+    def decorator(func):
+        if tracing_mode == "off":
+            return func
+        traced_func = None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal traced_func
+            with trace_root() as traced:
+                if not traced:
+                    return func(*args, **kwargs)
+                if traced_func is None:
+                    # Import de Langfuse et création du client différés au premier appel tracé
+                    from langfuse import observe as langfuse_observe
+
+                    get_langfuse_client()
+                    traced_func = langfuse_observe(name=name)(func)
+                return traced_func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def callbacks_config(**kwargs) -> dict:
+    """
+    Construit la config LangChain d'un appel avec le handler Langfuse (si la requête est tracée).
+    À l'intérieur d'un run parent (graphe LangGraph), les callbacks hérités sont
+    conservés (traces imbriquées, streaming des tokens) au lieu d'être remplacés.
+
+    Args:
+        **kwargs: Clés de config supplémentaires (tags, max_concurrency, etc.)
+
+    Returns:
+        dict: Config à passer à `invoke` / `batch`.
+    """
+    if var_child_runnable_config.get() or not is_traced():
+        return kwargs
+    return {"callbacks": [get_langfuse_handler()], **kwargs}